@@ -3,45 +3,113 @@ Airline Booking Market Demand Analysis Web App
 Main Flask application entry point
 """
 
-from flask import Flask, render_template, request, jsonify, redirect, url_for
+from flask import Flask, Response, render_template, request, jsonify, redirect, stream_with_context, url_for
+from flask.json.provider import JSONProvider
+from flask_compress import Compress
 from flask_cors import CORS
+import orjson
 import os
 from dotenv import load_dotenv
 import logging
+import hashlib
+import functools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime, timedelta
+from collections.abc import Mapping
 
-# Import our custom modules
-from src.data_collector import DataCollector
-from src.data_processor import DataProcessor
-from src.api_integrator import APIIntegrator
-from src.visualizer import DataVisualizer
+from src.cache import cache_get, cache_set, get_redis
 
 # Load environment variables
 load_dotenv()
 
+def _orjson_default(obj):
+    """Serialize read-only mappings (shared constants) as objects, anything else as a string"""
+    if isinstance(obj, Mapping):
+        return dict(obj)
+    return str(obj)
+
+class ORJSONProvider(JSONProvider):
+    """Flask JSON provider backed by orjson (serializes NumPy types natively)"""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=_orjson_default,
+                            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 # Initialize Flask app
 app = Flask(__name__)
+app.json = ORJSONProvider(app)
 CORS(app)
 
+# Compress large HTML/JSON responses (results pages embed chart JSON)
+app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+app.config['COMPRESS_BR_LEVEL'] = 4
+app.config['COMPRESS_MIN_SIZE'] = 1024
+Compress(app)
+
 # Jinja helper: safe_url_for to avoid BuildError if route missing
+_known_endpoints = None
+
 @app.context_processor
 def utility_processor():
     def safe_url_for(endpoint, **values):
-        try:
-            return url_for(endpoint, **values)
-        except Exception:
+        global _known_endpoints
+        if _known_endpoints is None:
+            _known_endpoints = frozenset(app.view_functions)
+        if endpoint not in _known_endpoints:
             return '#'
+        return url_for(endpoint, **values)
     return dict(safe_url_for=safe_url_for)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Initialize our modules
-data_collector = DataCollector()
-data_processor = DataProcessor()
-api_integrator = APIIntegrator()
-visualizer = DataVisualizer()
+# Response cache TTLs (seconds)
+RESULTS_CACHE_TTL = 600     # price data is volatile
+ERROR_CACHE_TTL = 30        # short negative cache so failures don't stampede upstream
+
+def _cache_key(origin, destination, date_from, date_to):
+    """Build a normalized cache key for a results query"""
+    raw = '|'.join(str(v).strip().lower() for v in (origin, destination, date_from, date_to))
+    return 'results:' + hashlib.sha1(raw.encode()).hexdigest()
+
+# Lazily constructed singletons so routes only pay for the modules they use
+@functools.lru_cache(maxsize=1)
+def get_data_collector():
+    from src.data_collector import DataCollector
+    return DataCollector()
+
+@functools.lru_cache(maxsize=1)
+def get_data_processor():
+    from src.data_processor import DataProcessor
+    return DataProcessor()
+
+@functools.lru_cache(maxsize=1)
+def get_api_integrator():
+    from src.api_integrator import APIIntegrator
+    return APIIntegrator()
+
+@functools.lru_cache(maxsize=1)
+def get_visualizer():
+    from src.visualizer import DataVisualizer
+    return DataVisualizer()
+
+# gunicorn worker processes (gunicorn also reads WEB_CONCURRENCY as its -w default)
+WEB_WORKERS = max(1, int(os.getenv('WEB_CONCURRENCY', 1)))
+
+@functools.lru_cache(maxsize=1)
+def get_chart_pool():
+    """Process pool for CPU-bound chart rendering, created on first use"""
+    # Every gunicorn worker has its own pool, so split the CPUs between them. Chart processes come
+    # from a forkserver: forking this process from a request thread could copy locks held by the
+    # other request and pool threads into the child.
+    workers = max(1, min(4, (os.cpu_count() or 1) // WEB_WORKERS))
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('forkserver'))
 
 @app.route('/')
 def index():
@@ -76,40 +144,106 @@ def results():
     date_from = request.args.get('date_from', '')
     date_to = request.args.get('date_to', '')
     
+    search_params = {
+        'origin': origin,
+        'destination': destination,
+        'date_from': date_from,
+        'date_to': date_to
+    }
+    key = _cache_key(origin, destination, date_from, date_to)
+    
+    cached = cache_get(key)
+    if cached is not None:
+        if 'error' in cached:
+            return render_template('error.html', error=cached['error'])
+        return render_template('results.html',
+                             data=cached['data'],
+                             insights=cached['insights'],
+                             stream_insights=cached['insights'] is None,
+                             charts=cached['charts'],
+                             search_params=search_params)
+    
     try:
         # Collect data based on search parameters
-        raw_data = data_collector.collect_flight_data(origin, destination, date_from, date_to)
+        raw_data = get_data_collector().collect_flight_data(origin, destination, date_from, date_to)
         
         # Process the data
-        processed_data = data_processor.process_data(raw_data)
+        processed_data = get_data_processor().process_data(raw_data)
         
-        # Get AI insights
-        insights = api_integrator.get_insights(processed_data)
+        # Generate visualizations in a worker process while AI insights are fetched
+        charts_future = get_chart_pool().submit(get_visualizer().create_charts, processed_data)
         
-        # Generate visualizations
-        charts = visualizer.create_charts(processed_data)
+        # Get AI insights. They are streamed to the page via /results/stream only when Redis is
+        # configured, so the stream can read back this exact processed data instead of re-running
+        # the pipeline on freshly generated flights.
+        integrator = get_api_integrator()
+        can_stream = integrator.can_stream_insights() and get_redis() is not None
+        insights = None if can_stream else integrator.get_insights(processed_data)
+        
+        try:
+            charts = charts_future.result()
+        except BrokenProcessPool:
+            logger.warning("Chart worker pool broke, rendering charts in-process")
+            get_chart_pool.cache_clear()
+            charts = get_visualizer().create_charts(processed_data)
+        
+        cache_set(key, RESULTS_CACHE_TTL, {
+            'data': processed_data,
+            'insights': insights,
+            'charts': charts
+        })
         
         return render_template('results.html', 
                              data=processed_data,
                              insights=insights,
+                             stream_insights=insights is None,
                              charts=charts,
-                             search_params={
-                                 'origin': origin,
-                                 'destination': destination,
-                                 'date_from': date_from,
-                                 'date_to': date_to
-                             })
+                             search_params=search_params)
     
     except Exception as e:
         logger.error(f"Error processing results: {str(e)}")
+        cache_set(key, ERROR_CACHE_TTL, {'error': str(e)})
         return render_template('error.html', error=str(e))
 
+def _sse(payload, event=None):
+    """Format a payload as one server-sent event"""
+    prefix = f"event: {event}\n" if event else ''
+    return f"{prefix}data: {app.json.dumps(payload)}\n\n"
+
+@app.route('/results/stream')
+def results_stream():
+    """Server-sent events stream of AI insights for a results query"""
+    origin = request.args.get('origin', '')
+    destination = request.args.get('destination', '')
+    date_from = request.args.get('date_from', '')
+    date_to = request.args.get('date_to', '')
+    
+    def generate():
+        try:
+            # Reuse the processed data cached by /results when available
+            cached = cache_get(_cache_key(origin, destination, date_from, date_to))
+            if cached is not None and 'data' in cached:
+                processed_data = cached['data']
+            else:
+                raw_data = get_data_collector().collect_flight_data(origin, destination, date_from, date_to)
+                processed_data = get_data_processor().process_data(raw_data)
+            
+            # Text deltas go out as plain messages, the final insights as an 'insights' event
+            for event, payload in get_api_integrator().stream_insights(processed_data):
+                yield _sse(payload, None if event == 'delta' else event)
+        except Exception as e:
+            logger.error(f"Error streaming insights: {str(e)}")
+            yield _sse(str(e), 'error')
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache'})
+
 @app.route('/api/data')
 def api_data():
     """API endpoint for getting processed data"""
     try:
         # Get sample data for demonstration
-        sample_data = data_processor.get_sample_data()
+        sample_data = get_data_processor().get_sample_data()
         return jsonify(sample_data)
     except Exception as e:
         logger.error(f"API error: {str(e)}")
@@ -119,9 +253,9 @@ def api_data():
 def trends():
     """Trends analysis page"""
     try:
-        # Get trending routes and insights
-        trending_data = data_processor.get_trending_routes()
-        price_trends = data_processor.get_price_trends()
+        # Get trending routes and insights (shared in-process constants, no cache round-trip needed)
+        trending_data = get_data_processor().get_trending_routes()
+        price_trends = get_data_processor().get_price_trends()
         
         return render_template('trends.html', 
                              trending_routes=trending_data,
@@ -0,0 +1,27 @@
+"""
+Pytest configuration
+Import paths, shared fixtures, and xdist scheduling that keeps each test class on one worker
+"""
+
+import os
+import sys
+
+import pytest
+
+# Make the app package and src modules importable once per process, before collection
+ROOT = os.path.dirname(os.path.abspath(__file__))
+for path in (ROOT, os.path.join(ROOT, 'src')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_cmdline_main(config):
+    # `pytest -n auto` defaults to --dist=load, which spreads a class's tests across workers
+    if getattr(config.option, 'numprocesses', None) and config.option.dist == 'no':
+        config.option.dist = 'loadscope'
+
+@pytest.fixture(scope='session')
+def client():
+    """Flask test client shared by every smoke test in the session"""
+    from app import app
+    return app.test_client()
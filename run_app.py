@@ -5,17 +5,34 @@ Simple script to run the Airline Market Analyzer Flask application
 
 import os
 import sys
+import subprocess
 
 # Add the current directory to Python path
-sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, APP_DIR)
 
-# Import and run the Flask app
+# Run the Flask app (dev server in debug mode, gunicorn otherwise)
 if __name__ == '__main__':
-    from app import app
+    debug_mode = os.getenv('FLASK_DEBUG', 'False').lower() == 'true'
     print("🚀 Starting Airline Market Analyzer...")
     print("📊 Dashboard will be available at: http://localhost:5000")
     print("🔍 Search flights at: http://localhost:5000/search")
     print("📈 View trends at: http://localhost:5000/trends")
     print("\n✨ Press Ctrl+C to stop the server\n")
     
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    if debug_mode:
+        from app import app
+        app.run(debug=True, host='0.0.0.0', port=5000)
+    else:
+        # Exported so the app can split CPUs between the workers' chart pools
+        workers = os.getenv('WEB_CONCURRENCY', str(os.cpu_count() or 1))
+        result = subprocess.run([
+            "gunicorn",
+            "-w", workers,
+            "-k", "gthread",
+            "--threads", os.getenv('WEB_THREADS', '4'),
+            "--preload",
+            "-b", "0.0.0.0:5000",
+            "app:app"
+        ], cwd=APP_DIR, env=dict(os.environ, WEB_CONCURRENCY=workers))
+        sys.exit(result.returncode)
@@ -0,0 +1,71 @@
+"""
+Numba Kernels Module
+JIT-compiled numeric kernels for hot analysis loops (used only when numba is installed)
+"""
+
+import numpy as np
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:  # numba is optional; callers fall back to pure Python/NumPy
+    NUMBA_AVAILABLE = False
+
+# Below this many elements the JIT dispatch overhead outweighs the speedup
+JIT_MIN_SIZE = 1000
+
+if NUMBA_AVAILABLE:
+
+    @njit(cache=True, fastmath=True)
+    def route_stats(prices):
+        """Return (mean, min, max) of a non-empty float64 array in a single pass"""
+        s = 0.0
+        mn = prices[0]
+        mx = prices[0]
+        for i in range(prices.shape[0]):
+            p = prices[i]
+            s += p
+            if p < mn:
+                mn = p
+            if p > mx:
+                mx = p
+        return s / prices.shape[0], mn, mx
+
+    @njit(cache=True, fastmath=True)
+    def sample_prices(base_price, multipliers, weekend, hours):
+        """Apply weekend and peak-hour premiums to multipliers and return rounded int64 prices"""
+        out = np.empty(multipliers.shape[0], dtype=np.int64)
+        for i in range(multipliers.shape[0]):
+            m = multipliers[i]
+            if weekend[i]:
+                m *= 1.2
+            h = hours[i]
+            if h == 7 or h == 8 or h == 17 or h == 18 or h == 19:
+                m *= 1.15
+            out[i] = np.int64(np.rint(base_price * m))
+        return out
+
+    @njit(cache=True, fastmath=True)
+    def group_stats(codes, prices, direct, direct_valid, ngroups):
+        """Single pass per-group count, price sum/min/max and direct-flight sum/count.
+        direct must have NaN replaced by 0, with direct_valid marking the non-missing flags.
+        """
+        count = np.zeros(ngroups, dtype=np.int64)
+        price_sum = np.zeros(ngroups, dtype=np.float64)
+        price_min = np.full(ngroups, np.inf)
+        price_max = np.full(ngroups, -np.inf)
+        direct_sum = np.zeros(ngroups, dtype=np.float64)
+        direct_count = np.zeros(ngroups, dtype=np.int64)
+        for i in range(codes.shape[0]):
+            g = codes[i]
+            p = prices[i]
+            count[g] += 1
+            price_sum[g] += p
+            if p < price_min[g]:
+                price_min[g] = p
+            if p > price_max[g]:
+                price_max[g] = p
+            if direct_valid[i]:
+                direct_sum[g] += direct[i]
+                direct_count[g] += 1
+        return count, price_sum, price_min, price_max, direct_sum, direct_count
@@ -5,64 +5,55 @@ Handles integration with AI APIs for generating insights from flight data
 
 import openai
 import os
-import json
+import orjson
+import hashlib
+import functools
 import logging
+import threading
+import time
 import requests
-from typing import Dict, List
+import numpy as np
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from string import Template
+from typing import Callable, Dict, Iterator, List, Tuple
 from datetime import datetime
 
-logger = logging.getLogger(__name__)
+try:
+    from ._numba_kernels import NUMBA_AVAILABLE, JIT_MIN_SIZE
+except ImportError:
+    from _numba_kernels import NUMBA_AVAILABLE, JIT_MIN_SIZE
 
-class APIIntegrator:
-    """Integrates with AI APIs to generate insights from flight data"""
+if NUMBA_AVAILABLE:
+    try:
+        from ._numba_kernels import route_stats
+    except ImportError:
+        from _numba_kernels import route_stats
 
-    def __init__(self):
-        self.openai_api_key = os.getenv('OPENAI_API_KEY')
-        if self.openai_api_key:
-            openai.api_key = self.openai_api_key
+logger = logging.getLogger(__name__)
 
-    def get_insights(self, processed_data: Dict) -> Dict:
-        """Generate AI-powered insights from processed flight data"""
+def _json_default(obj):
+    """Convert NumPy scalars (and anything else) to JSON-serializable values"""
+    if hasattr(obj, 'item'):
+        return obj.item()
+    return str(obj)
 
-        logger.info("Generating AI insights from processed data...")
+@functools.lru_cache(maxsize=1)
+def _now_iso_second(second: int) -> str:
+    """ISO timestamp for a given epoch second (cached for the current second)"""
+    return datetime.fromtimestamp(second).isoformat()
 
-        # If OpenAI API is available, use it for insights
-        if self.openai_api_key:
-            try:
-                ai_insights = self._get_openai_insights(processed_data)
-                return ai_insights
-            except Exception as e:
-                logger.warning(f"OpenAI API failed: {str(e)}, trying free HF API, else rule-based insights")
-                # fallback to free HuggingFace Inference if token is provided
-                hf = os.getenv('HUGGINGFACE_API_TOKEN')
-                if hf:
-                    try:
-                        return self._get_hf_insights(processed_data, hf)
-                    except Exception as ie:
-                        logger.warning(f"HuggingFace API failed: {ie}")
-                # Next fallback
-                return self._generate_rule_based_insights(processed_data)
-        else:
-            # No OpenAI key; attempt free HF first if token provided
-            hf = os.getenv('HUGGINGFACE_API_TOKEN')
-            if hf:
-                try:
-                    return self._get_hf_insights(processed_data, hf)
-                except Exception as e:
-                    logger.warning(f"HuggingFace API failed: {e}, using rule-based insights")
-            return self._generate_rule_based_insights(processed_data)
-
-    def _get_openai_insights(self, data: Dict) -> Dict:
-        """Get insights using OpenAI API"""
-
-        # Prepare data summary for AI analysis
-        summary = self._prepare_data_summary(data)
+def _now_iso() -> str:
+    """Current time as an ISO string, at one-second resolution"""
+    return _now_iso_second(int(time.time()))
 
-        prompt = f"""
+# OpenAI prompt, rendered with the data summary per request
+_PROMPT_TEMPLATE = Template("""
         Analyze the following airline booking data and provide insights for a hostel business
         looking to understand market demand trends:
 
-        {summary}
+        $summary
 
         Please provide insights in the following areas:
         1. Market demand trends
@@ -72,94 +63,288 @@ class APIIntegrator:
         5. Future outlook
 
         Format your response as JSON with the following structure:
-        {{
+        {
             "demand_trends": "analysis of demand patterns",
             "pricing_insights": "key pricing observations",
             "route_recommendations": "recommended routes to focus on",
             "business_recommendations": "specific advice for hostel business",
             "market_outlook": "future predictions and trends"
-        }}
-        """
+        }
+        """)
+
+# Data summary sent to AI providers (bound str.format methods)
+_SUMMARY_TEMPLATE = (
+    "Flight Data Summary:\n"
+    "- Total flights analyzed: {tf}\n"
+    "- Date range: {dr_start} to {dr_end}\n"
+    "- Price range: ${pmin} - ${pmax}\n"
+    "- Average price: ${pavg:.2f}\n"
+).format
+_ROUTE_LINE = "- {route}: {flight_count} flights, avg ${avg_price:.2f}".format
+_WEEKEND_PRICING = (
+    "\nWeekend vs Weekday Pricing:\n"
+    "- Weekend average: ${weekend_avg:.2f}\n"
+    "- Weekday average: ${weekday_avg:.2f}"
+).format
+
+# Rule tables for rule-based insights: first matching predicate wins
+_DEMAND_RULES = (
+    (lambda n: n > 100, "High demand detected with strong booking activity across multiple routes. Market shows healthy competition and frequent flights."),
+    (lambda n: n > 50, "Moderate demand with steady booking patterns. Good opportunities for targeted marketing."),
+    (lambda n: True, "Lower demand period detected. Consider focusing on high-value routes and promotional strategies."),
+)
+
+_PRICING_RULES = (
+    (lambda avg, std: avg > 0 and std / avg > 0.3, "High price volatility detected (avg: ${avg:.2f}). Significant opportunities for finding deals. Price varies by {variation:.1f}% on average."),
+    (lambda avg, std: True, "Stable pricing environment (avg: ${avg:.2f}). Consistent market with predictable costs."),
+)
+
+_WEEKEND_PREMIUM_TEMPLATE = " Weekend flights cost {premium:.1f}% more than weekdays."
+
+_OUTLOOK_RULES = (
+    (lambda flights, routes: flights > 200 and routes > 5, "Strong market outlook with diverse route options and high flight frequency. Excellent environment for travel-related businesses."),
+    (lambda flights, routes: flights > 100, "Positive market outlook with good flight availability. Steady demand supports business growth opportunities."),
+    (lambda flights, routes: True, "Developing market with growth potential. Monitor trends closely and focus on high-demand periods."),
+)
+
+# Request threads per web worker (gunicorn --threads); keep in sync with the Procfile/run_app.py
+WEB_THREADS = int(os.getenv('WEB_THREADS', 4))
+
+# Shared worker pool for racing AI providers against each other. Every request thread can have
+# two provider calls in flight, and a losing call keeps running once started, so size the pool
+# for two calls per thread rather than letting requests queue behind each other's abandoned calls.
+_insights_pool = ThreadPoolExecutor(max_workers=2 * WEB_THREADS, thread_name_prefix='insights')
+
+# Pooled keep-alive HTTP session for inference APIs, retrying transient gateway errors
+_HTTP_RETRY = Retry(total=2, backoff_factor=0.5, status_forcelist=[502, 503, 504],
+                    allowed_methods=frozenset({'POST'}))
+_http = requests.Session()
+_http.mount('https://', HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=20,
+    max_retries=_HTTP_RETRY
+))
+
+# Per-attempt timeout for HuggingFace inference calls (seconds)
+HF_REQUEST_TIMEOUT = 20
+
+# How long coalesced HF callers wait for the owner's call: every attempt timing out, plus an
+# upper bound on the backoff sleeps between retries, plus a little slack
+HF_WAIT_TIMEOUT = (HF_REQUEST_TIMEOUT * (_HTTP_RETRY.total + 1)
+                   + _HTTP_RETRY.backoff_factor * 2 ** (_HTTP_RETRY.total + 1) + 5)
+
+# In-flight HuggingFace requests keyed by payload hash, so identical concurrent
+# requests share one inference call
+_hf_inflight: Dict[str, Future] = {}
+_hf_inflight_lock = threading.Lock()
 
-        try:
-            response = openai.Completion.create(
-                engine="text-davinci-003",
-                prompt=prompt,
-                max_tokens=1000,
-                temperature=0.7
-            )
+class APIIntegrator:
+    """Integrates with AI APIs to generate insights from flight data"""
 
-            # Parse the AI response
-            ai_text = response.choices[0].text.strip()
+    def __init__(self):
+        self.openai_api_key = os.getenv('OPENAI_API_KEY')
+        self._openai_client = None
+
+    @property
+    def openai_client(self) -> 'openai.OpenAI':
+        """OpenAI client, created on first use"""
+        if self._openai_client is None:
+            self._openai_client = openai.OpenAI(api_key=self.openai_api_key)
+        return self._openai_client
+
+    def get_insights(self, processed_data: Dict, include_openai: bool = True) -> Dict:
+        """Generate AI-powered insights from processed flight data"""
 
-            # Try to extract JSON from the response
+        logger.info("Generating AI insights from processed data...")
+
+        # Query every configured AI provider concurrently; first success wins
+        providers = []
+        if include_openai and self.openai_api_key:
+            providers.append(('OpenAI', lambda: self._get_openai_insights(processed_data)))
+        hf = os.getenv('HUGGINGFACE_API_TOKEN')
+        if hf:
+            providers.append(('HuggingFace', lambda: self._get_hf_insights(processed_data, hf)))
+
+        if providers:
             try:
-                insights = json.loads(ai_text)
-            except json.JSONDecodeError:
-                # If JSON parsing fails, create structured response from text
-                insights = {
-                    "demand_trends": ai_text[:200] + "...",
-                    "pricing_insights": "AI analysis provided",
-                    "route_recommendations": "See full analysis",
-                    "business_recommendations": "Detailed recommendations available",
-                    "market_outlook": "Positive outlook based on data",
-                    "full_analysis": ai_text
-                }
-
-            # Add metadata
-            insights["source"] = "openai_api"
-            insights["generated_at"] = datetime.now().isoformat()
+                return self._first_successful(providers)
+            except Exception as e:
+                logger.warning(f"AI insight providers failed: {str(e)}, using rule-based insights")
 
-            return insights
+        return self._generate_rule_based_insights(processed_data)
 
+    def can_stream_insights(self) -> bool:
+        """Whether insights can be streamed token-by-token (requires OpenAI)"""
+        return bool(self.openai_api_key)
+
+    def stream_insights(self, data: Dict) -> Iterator[Tuple[str, object]]:
+        """Stream OpenAI insights as ('delta', text) events followed by one ('insights', dict) event.
+        Falls back to the other insight providers if streaming fails.
+        """
+        parts = []
+        try:
+            for delta in self._stream_openai_text(data):
+                parts.append(delta)
+                yield 'delta', delta
+            insights = self._parse_openai_insights(''.join(parts))
+        except Exception as e:
+            logger.warning(f"OpenAI streaming failed: {str(e)}, using fallback insights")
+            insights = self.get_insights(data, include_openai=False)
+        yield 'insights', insights
+
+    def _first_successful(self, providers: List[Tuple[str, Callable[[], Dict]]]) -> Dict:
+        """Run providers in parallel and return the first successful result"""
+
+        futures = {_insights_pool.submit(fn): name for name, fn in providers}
+        pending = set(futures)
+        errors = []
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.warning(f"{futures[future]} API failed: {str(e)}")
+                    errors.append(f"{futures[future]}: {e}")
+                    continue
+                for other in pending:
+                    other.cancel()
+                return result
+        raise RuntimeError('; '.join(errors))
+
+    def _get_openai_insights(self, data: Dict) -> Dict:
+        """Get insights using OpenAI API"""
+
+        try:
+            return self._parse_openai_insights(''.join(self._stream_openai_text(data)))
         except Exception as e:
             logger.error(f"OpenAI API error: {str(e)}")
             raise
 
+    def _stream_openai_text(self, data: Dict) -> Iterator[str]:
+        """Yield the OpenAI response text deltas as they are generated"""
+
+        # Prepare data summary for AI analysis
+        summary = self._prepare_data_summary(data)
+        prompt = _PROMPT_TEMPLATE.substitute(summary=summary)
+
+        response = self.openai_client.chat.completions.create(
+            model="gpt-3.5-turbo-0125",
+            messages=[
+                {"role": "system", "content": "Return valid JSON only."},
+                {"role": "user", "content": prompt}
+            ],
+            response_format={"type": "json_object"},
+            stream=True,
+            max_tokens=1000,
+            temperature=0.7
+        )
+
+        for chunk in response:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    def _parse_openai_insights(self, ai_text: str) -> Dict:
+        """Parse the accumulated OpenAI JSON response and add metadata"""
+
+        # JSON mode guarantees a JSON object
+        insights = orjson.loads(ai_text)
+        insights["source"] = "openai_api"
+        insights["generated_at"] = _now_iso()
+        return insights
+
     def _prepare_data_summary(self, data: Dict) -> str:
         """Prepare a concise summary of the data for AI analysis"""
 
         analysis = data.get('analysis', {})
-        summary_stats = analysis.get('summary', {})
-        price_analysis = analysis.get('price_analysis', {})
-        route_analysis = analysis.get('route_analysis', {})
-
-        summary = f"""
-        Flight Data Summary:
-        - Total flights analyzed: {summary_stats.get('total_flights', 0)}
-        - Date range: {summary_stats.get('date_range', {}).get('start', 'N/A')} to {summary_stats.get('date_range', {}).get('end', 'N/A')}
-        - Price range: ${summary_stats.get('price_range', {}).get('min', 0)} - ${summary_stats.get('price_range', {}).get('max', 0)}
-        - Average price: ${summary_stats.get('price_range', {}).get('avg', 0):.2f}
-
-        Popular Routes:
-        """
+        relevant = {
+            'summary': analysis.get('summary', {}),
+            'popular_routes': analysis.get('route_analysis', {}).get('popular_routes', [])[:5],
+            'weekend_premium': analysis.get('price_analysis', {}).get('weekend_premium', {})
+        }
+        data_json = orjson.dumps(relevant, default=_json_default,
+                                 option=orjson.OPT_SORT_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+        data_hash = hashlib.md5(data_json).hexdigest()
+        return self._build_data_summary(data_hash, data_json)
+
+    @staticmethod
+    @functools.lru_cache(maxsize=512)
+    def _build_data_summary(data_hash: str, data_json: bytes) -> str:
+        """Build the summary text from the relevant data subset (memoized by content hash)"""
+
+        relevant = orjson.loads(data_json)
+        summary_stats = relevant['summary']
+        date_range = summary_stats.get('date_range', {})
+        price_range = summary_stats.get('price_range', {})
+
+        summary_parts = [
+            _SUMMARY_TEMPLATE(
+                tf=summary_stats.get('total_flights', 0),
+                dr_start=date_range.get('start', 'N/A'),
+                dr_end=date_range.get('end', 'N/A'),
+                pmin=price_range.get('min', 0),
+                pmax=price_range.get('max', 0),
+                pavg=price_range.get('avg') or 0
+            ),
+            "Popular Routes:"
+        ]
 
         # Add popular routes
-        popular_routes = route_analysis.get('popular_routes', [])[:5]
-        for route in popular_routes:
-            summary += f"- {route.get('route', 'N/A')}: {route.get('flight_count', 0)} flights, avg ${route.get('avg_price', 0):.2f}\n"
+        summary_parts.extend(
+            _ROUTE_LINE(route=route.get('route', 'N/A'),
+                        flight_count=route.get('flight_count', 0),
+                        avg_price=route.get('avg_price') or 0)
+            for route in relevant['popular_routes']
+        )
 
         # Add pricing insights
-        weekend_premium = price_analysis.get('weekend_premium', {})
+        weekend_premium = relevant['weekend_premium']
         if weekend_premium:
-            summary += f"\nWeekend vs Weekday Pricing:\n"
-            summary += f"- Weekend average: ${weekend_premium.get('weekend_avg', 0):.2f}\n"
-            summary += f"- Weekday average: ${weekend_premium.get('weekday_avg', 0):.2f}\n"
+            summary_parts.append(_WEEKEND_PRICING(
+                weekend_avg=weekend_premium.get('weekend_avg') or 0,
+                weekday_avg=weekend_premium.get('weekday_avg') or 0
+            ))
 
-        return summary
+        return "\n".join(summary_parts)
 
     def _get_hf_insights(self, data: Dict, token: str) -> Dict:
         """Get insights from a free Hugging Face model (e.g., text summarization) as a fallback.
-        This keeps costs at zero when OpenAI is not configured.
+        This keeps costs at zero when OpenAI is not configured. Concurrent calls with the
+        same summary are coalesced into a single inference request.
         """
-        summary = self._prepare_data_summary(data)
+        summary = self._prepare_data_summary(data)[:2000]
+        key = hashlib.sha1(summary.encode()).hexdigest()
+
+        with _hf_inflight_lock:
+            future = _hf_inflight.get(key)
+            is_owner = future is None
+            if is_owner:
+                future = Future()
+                _hf_inflight[key] = future
+
+        if not is_owner:
+            return dict(future.result(timeout=HF_WAIT_TIMEOUT))
+
+        try:
+            insights = self._request_hf_insights(summary, token)
+            future.set_result(insights)
+            return dict(insights)
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with _hf_inflight_lock:
+                _hf_inflight.pop(key, None)
+
+    def _request_hf_insights(self, summary: str, token: str) -> Dict:
+        """Call the Hugging Face inference API and shape the result as insights"""
         api_url = 'https://api-inference.huggingface.co/models/facebook/bart-large-cnn'
         headers = {"Authorization": f"Bearer {token}"}
-        payload = {"inputs": summary[:2000]}
+        payload = {"inputs": summary}
         try:
-            r = requests.post(api_url, headers=headers, json=payload, timeout=20)
+            r = _http.post(api_url, headers=headers, json=payload, timeout=HF_REQUEST_TIMEOUT)
             r.raise_for_status()
-            out = r.json()
+            out = orjson.loads(r.content)
             text = ''
             if isinstance(out, list) and out and 'summary_text' in out[0]:
                 text = out[0]['summary_text']
@@ -174,7 +359,7 @@ class APIIntegrator:
                 "business_recommendations": "Adjust hostel pricing around peak/low seasons; partner on top routes",
                 "market_outlook": "Moderately positive outlook based on summarized trends",
                 "source": "huggingface_api",
-                "generated_at": datetime.now().isoformat()
+                "generated_at": _now_iso()
             }
             return insights
         except Exception as e:
@@ -188,36 +373,28 @@ class APIIntegrator:
         summary_stats = analysis.get('summary', {})
         price_analysis = analysis.get('price_analysis', {})
         route_analysis = analysis.get('route_analysis', {})
-        time_analysis = analysis.get('time_analysis', {})
 
         insights = {
             "source": "rule_based_analysis",
-            "generated_at": datetime.now().isoformat()
+            "generated_at": _now_iso()
         }
 
         # Demand trends analysis
         total_flights = summary_stats.get('total_flights', 0)
-        if total_flights > 100:
-            insights["demand_trends"] = "High demand detected with strong booking activity across multiple routes. Market shows healthy competition and frequent flights."
-        elif total_flights > 50:
-            insights["demand_trends"] = "Moderate demand with steady booking patterns. Good opportunities for targeted marketing."
-        else:
-            insights["demand_trends"] = "Lower demand period detected. Consider focusing on high-value routes and promotional strategies."
+        insights["demand_trends"] = next(msg for pred, msg in _DEMAND_RULES if pred(total_flights))
 
         # Pricing insights
         price_stats = price_analysis.get('statistics', {})
         avg_price = price_stats.get('mean', 0)
         price_std = price_stats.get('std', 0)
-
-        if avg_price > 0 and price_std / avg_price > 0.3:  # High price variation
-            insights["pricing_insights"] = f"High price volatility detected (avg: ${avg_price:.2f}). Significant opportunities for finding deals. Price varies by {(price_std/avg_price*100):.1f}% on average."
-        else:
-            insights["pricing_insights"] = f"Stable pricing environment (avg: ${avg_price:.2f}). Consistent market with predictable costs."
+        template = next(msg for pred, msg in _PRICING_RULES if pred(avg_price, price_std))
+        variation = price_std / avg_price * 100 if avg_price > 0 else 0
+        insights["pricing_insights"] = template.format(avg=avg_price, variation=variation)
 
         # Weekend premium analysis
-        weekend_premium = price_analysis.get('weekend_premium', {})
-        if weekend_premium.get('premium_percentage', 0) > 10:
-            insights["pricing_insights"] += f" Weekend flights cost {weekend_premium.get('premium_percentage', 0):.1f}% more than weekdays."
+        premium = price_analysis.get('weekend_premium', {}).get('premium_percentage', 0)
+        if premium > 10:
+            insights["pricing_insights"] += _WEEKEND_PREMIUM_TEMPLATE.format(premium=premium)
 
         # Route recommendations
         popular_routes = route_analysis.get('popular_routes', [])[:3]
@@ -278,48 +455,49 @@ class APIIntegrator:
         total_flights = summary_stats.get('total_flights', 0)
         unique_routes = summary_stats.get('unique_routes', 0)
 
-        if total_flights > 200 and unique_routes > 5:
-            return "Strong market outlook with diverse route options and high flight frequency. Excellent environment for travel-related businesses."
-        elif total_flights > 100:
-            return "Positive market outlook with good flight availability. Steady demand supports business growth opportunities."
-        else:
-            return "Developing market with growth potential. Monitor trends closely and focus on high-demand periods."
+        return next(msg for pred, msg in _OUTLOOK_RULES if pred(total_flights, unique_routes))
 
     def get_route_insights(self, route: str, data: Dict) -> Dict:
         """Get specific insights for a particular route"""
 
-        # Filter data for specific route
-        flights_data = data.get('flights_data', [])
-        route_flights = [f for f in flights_data if f.get('route') == route]
+        # Filter data for specific route straight into a price array
+        columns = data.get('flights_data_columns')
+        if columns is not None:
+            routes = np.asarray(columns.get('route', []), dtype=object)
+            prices = np.asarray(columns.get('price', []), dtype=np.float64)
+            prices = prices[routes == route] if routes.size == prices.size else prices[:0]
+        else:
+            # Legacy per-flight records
+            prices = np.fromiter((f['price'] for f in data.get('flights_data', []) if f.get('route') == route),
+                                 dtype=np.float64, count=-1)
 
-        if not route_flights:
+        if prices.size == 0:
             return {"error": f"No data available for route {route}"}
 
         # Calculate route-specific metrics
-        prices = [f['price'] for f in route_flights]
-        avg_price = sum(prices) / len(prices)
-        min_price = min(prices)
-        max_price = max(prices)
+        if NUMBA_AVAILABLE and prices.size >= JIT_MIN_SIZE:
+            avg_price, min_price, max_price = (float(v) for v in route_stats(prices))
+        else:
+            avg_price, min_price, max_price = float(prices.mean()), float(prices.min()), float(prices.max())
+        flight_count = int(prices.size)
 
         insights = {
             "route": route,
-            "flight_count": len(route_flights),
+            "flight_count": flight_count,
             "price_analysis": {
                 "average": avg_price,
                 "minimum": min_price,
                 "maximum": max_price,
                 "price_range": max_price - min_price
             },
-            "recommendation": self._get_route_recommendation(route_flights, avg_price)
+            "recommendation": self._get_route_recommendation(flight_count, avg_price)
         }
 
         return insights
 
-    def _get_route_recommendation(self, route_flights: List[Dict], avg_price: float) -> str:
+    def _get_route_recommendation(self, flight_count: int, avg_price: float) -> str:
         """Generate recommendation for a specific route"""
 
-        flight_count = len(route_flights)
-
         if flight_count > 20:
             return f"High-demand route with {flight_count} flights. Average price ${avg_price:.2f}. Excellent for business travelers."
         elif flight_count > 10:
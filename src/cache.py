@@ -0,0 +1,64 @@
+"""
+Cache Module
+Shared Redis helpers for caching pickled results across requests and workers
+"""
+
+import os
+import pickle
+import functools
+import logging
+from typing import Any, Callable, Optional
+
+try:
+    import redis
+except ImportError:  # Redis is optional; caching is disabled without it
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+@functools.lru_cache(maxsize=1)
+def get_redis():
+    """Redis client built from REDIS_URL, or None when caching is not configured"""
+    redis_url = os.getenv('REDIS_URL')
+    if redis is None or not redis_url:
+        return None
+    return redis.Redis.from_url(redis_url)
+
+def cache_get(key: str) -> Optional[Any]:
+    """Fetch and unpickle a cached value, or None on miss/unavailable cache"""
+    client = get_redis()
+    if client is None:
+        return None
+    try:
+        cached = client.get(key)
+        return pickle.loads(cached) if cached is not None else None
+    except Exception as e:
+        logger.warning(f"Cache read failed for {key}: {str(e)}")
+        return None
+
+def cache_set(key: str, ttl: int, value: Any) -> None:
+    """Pickle and store a value with a TTL; failures are logged and ignored"""
+    client = get_redis()
+    if client is None:
+        return
+    try:
+        client.setex(key, ttl, pickle.dumps(value))
+    except Exception as e:
+        logger.warning(f"Cache write failed for {key}: {str(e)}")
+
+def redis_memoize(ttl: int, key_fn: Callable[[Any], str]):
+    """Memoize a method in Redis, keyed by key_fn applied to its first argument"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, arg, *args, **kwargs):
+            if get_redis() is None:
+                return func(self, arg, *args, **kwargs)
+            key = f"memo:{func.__qualname__}:{key_fn(arg)}"
+            cached = cache_get(key)
+            if cached is not None:
+                return cached
+            result = func(self, arg, *args, **kwargs)
+            cache_set(key, ttl, result)
+            return result
+        return wrapper
+    return decorator
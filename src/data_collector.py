@@ -3,33 +3,157 @@ Data Collection Module
 Handles scraping and API integration for airline booking data
 """
 
-import requests
-import json
+import httpx
+import orjson
 import time
 import logging
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Sequence
 import os
-from bs4 import BeautifulSoup
+import re
+import gzip
+import errno
+import tempfile
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from selectolax.lexbor import LexborHTMLParser
+import hashlib
+import numpy as np
 import pandas as pd
-import random
+
+try:
+    from .cache import cache_get, cache_set
+except ImportError:
+    from cache import cache_get, cache_set
+
+try:
+    from ._numba_kernels import NUMBA_AVAILABLE, JIT_MIN_SIZE
+except ImportError:
+    from _numba_kernels import NUMBA_AVAILABLE, JIT_MIN_SIZE
+
+if NUMBA_AVAILABLE:
+    try:
+        from ._numba_kernels import sample_prices
+    except ImportError:
+        from _numba_kernels import sample_prices
 
 logger = logging.getLogger(__name__)
 
+# Shared pool for overlapping blocking network fetches
+_fetch_pool = ThreadPoolExecutor(max_workers=4)
+
+# Separate pool for whole collection sources, which may themselves wait on _fetch_pool
+_source_pool = ThreadPoolExecutor(max_workers=4)
+
+# Market trends come from a slow, mostly-static scrape; reuse them for a day
+MARKET_TRENDS_TTL = 24 * 3600
+
+# Redis copy of each collected search, checked before the file cache
+FLIGHT_DATA_CACHE_TTL = 3600
+
+# Number of timestamped flight data snapshots kept in the cache directory
+CACHE_KEEP_FILES = 50
+
+# Flight records repeat the same strings heavily, so even fast gzip levels shrink them several-fold
+CACHE_COMPRESS_LEVEL = 5
+
+# Sample data generation constants
+_ROUTE_PRICES = {
+    ('SYD', 'MEL'): 150,
+    ('MEL', 'SYD'): 150,
+    ('SYD', 'BNE'): 200,
+    ('BNE', 'SYD'): 200,
+    ('MEL', 'BNE'): 250,
+    ('BNE', 'MEL'): 250,
+    ('SYD', 'PER'): 400,
+    ('PER', 'SYD'): 400,
+    ('MEL', 'ADL'): 180,
+    ('ADL', 'MEL'): 180,
+}
+_AIRLINES = ('Jetstar', 'Virgin Australia', 'Qantas', 'Tiger Airways')
+_DIRECT_CHOICES = (True, True, False)  # 2/3 chance of direct
+_PEAK_HOURS = (7, 8, 17, 18, 19)
+
+# Wikipedia route scrape constants
+_WIKIPEDIA_ROUTE_URLS = (
+    'https://en.wikipedia.org/wiki/List_of_busiest_air_routes_in_Australia',
+    'https://en.wikipedia.org/wiki/List_of_the_busiest_air_routes'
+)
+_CITY_TO_IATA = {
+    'sydney': 'SYD', 'melbourne': 'MEL', 'brisbane': 'BNE', 'perth': 'PER',
+    'adelaide': 'ADL', 'canberra': 'CBR', 'darwin': 'DRW', 'hobart': 'HBA',
+    'gold coast': 'OOL'
+}
+
+# Longest names first so multi-word cities win over any shorter overlap
+_CITY_RE = re.compile(
+    r'\b(' + '|'.join(sorted((re.escape(c) for c in _CITY_TO_IATA), key=len, reverse=True)) + r')\b'
+)
+
+# os.link errors meaning the filesystem can't hardlink (rather than a real failure)
+_NO_HARDLINK_ERRNOS = frozenset({errno.EPERM, errno.EOPNOTSUPP, errno.EXDEV, errno.EMLINK})
+
+def _write_temp_file(directory: str, payload: bytes) -> str:
+    """Write payload to a new uniquely named temp file in directory and return its path"""
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(payload)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return tmp_path
+
+def _city_to_iata(name: str) -> Optional[str]:
+    """Map a city name to its IATA code, also matching names with extra text (e.g. 'sydney (domestic)')"""
+    code = _CITY_TO_IATA.get(name)
+    if code:
+        return code
+    match = _CITY_RE.search(name)
+    return _CITY_TO_IATA[match.group(1)] if match else None
+
+def _flight_cache_key(search_params: Dict) -> str:
+    """Redis key for the flight data collected for one search"""
+    raw = '|'.join(str(search_params.get(k) or '') for k in ('origin', 'destination', 'date_from', 'date_to'))
+    return 'flights:' + hashlib.sha1(raw.encode()).hexdigest()
+
 class DataCollector:
     """Collects airline booking data from various sources"""
     
-    def __init__(self):
+    def __init__(self, seed: Optional[int] = None):
         self.rapidapi_key = os.getenv('RAPIDAPI_KEY')
         self.amadeus_client_id = os.getenv('AMADEUS_CLIENT_ID')
         self.amadeus_client_secret = os.getenv('AMADEUS_CLIENT_SECRET')
         self.cache_dir = 'data/cache'
         os.makedirs(self.cache_dir, exist_ok=True)
         
+        # Persistent HTTP/2 client: concurrent requests to one host share a single multiplexed connection.
+        # HTTP/2 and pool limits are configured on the transport (Client-level copies are ignored when
+        # a transport is given); redirects are followed as requests did (e.g. moved Wikipedia articles).
+        self.session = httpx.Client(
+            timeout=10,
+            follow_redirects=True,
+            transport=httpx.HTTPTransport(
+                http2=True,
+                retries=3,
+                limits=httpx.Limits(max_keepalive_connections=20, max_connections=100)
+            )
+        )
+        
+        self._market_cache = {'ts': 0, 'data': None}
+        self._last_cache_hash = None
+        
+        # One generator for all sample data draws; pass a seed for reproducible output
+        self.rng = np.random.default_rng(seed)
+        self.market_cache_file = os.path.join(self.cache_dir, 'market_trends.json')
+        
     def collect_flight_data(self, origin: str, destination: str, 
                           date_from: str, date_to: str) -> Dict:
         """Main method to collect flight data from multiple sources"""
         
+        # Flight records use ISO-8601 'date' (YYYY-MM-DD) and 24h 'time' (HH:MM) strings;
+        # DataProcessor parses both with fixed formats and drops rows that don't match
+        
         logger.info(f"Collecting flight data: {origin} -> {destination}, {date_from} to {date_to}")
         
         # Try multiple data sources
@@ -45,21 +169,28 @@ class DataCollector:
             'collection_timestamp': datetime.now().isoformat()
         }
         
+        # Network-bound sources run in the background while sample data is generated
         # Source 1: RapidAPI Skyscanner (if API key available)
+        rapidapi_future = None
         if self.rapidapi_key:
+            rapidapi_future = _source_pool.submit(self._collect_from_rapidapi, origin, destination, date_from)
+        
+        # Source 3: Collect market trends data
+        market_future = _source_pool.submit(self._collect_market_trends)
+        
+        # Source 2: Generate sample data for demonstration
+        sample_data = self._generate_sample_data(origin, destination, date_from, date_to)
+        
+        if rapidapi_future is not None:
             try:
-                rapidapi_data = self._collect_from_rapidapi(origin, destination, date_from)
+                rapidapi_data = rapidapi_future.result()
                 data['flights'].extend(rapidapi_data)
                 logger.info(f"Collected {len(rapidapi_data)} flights from RapidAPI")
             except Exception as e:
                 logger.warning(f"RapidAPI collection failed: {str(e)}")
         
-        # Source 2: Generate sample data for demonstration
-        sample_data = self._generate_sample_data(origin, destination, date_from, date_to)
         data['flights'].extend(sample_data)
-        
-        # Source 3: Collect market trends data
-        data['market_data'] = self._collect_market_trends()
+        data['market_data'] = market_future.result()
         
         # Cache the results
         self._cache_data(data)
@@ -79,10 +210,10 @@ class DataCollector:
         }
         
         try:
-            response = requests.get(url, headers=headers, timeout=10)
+            response = self.session.get(url, headers=headers, timeout=10)
             response.raise_for_status()
             
-            data = response.json()
+            data = orjson.loads(response.content)
             flights = []
             
             # Process the response data
@@ -108,25 +239,9 @@ class DataCollector:
                             date_from: str, date_to: str) -> List[Dict]:
         """Generate realistic sample flight data for demonstration"""
         
-        flights = []
-        
-        # Popular routes with base prices
-        route_prices = {
-            ('SYD', 'MEL'): 150,
-            ('MEL', 'SYD'): 150,
-            ('SYD', 'BNE'): 200,
-            ('BNE', 'SYD'): 200,
-            ('MEL', 'BNE'): 250,
-            ('BNE', 'MEL'): 250,
-            ('SYD', 'PER'): 400,
-            ('PER', 'SYD'): 400,
-            ('MEL', 'ADL'): 180,
-            ('ADL', 'MEL'): 180,
-        }
-        
         # Get base price for route
         route_key = (origin.upper(), destination.upper())
-        base_price = route_prices.get(route_key, 300)
+        base_price = _ROUTE_PRICES.get(route_key, 300)
         
         # Generate flights for date range
         try:
@@ -136,43 +251,77 @@ class DataCollector:
             start_date = datetime.now()
             end_date = start_date + timedelta(days=7)
         
-        current_date = start_date
-        while current_date <= end_date:
-            # Generate 3-8 flights per day
-            num_flights = random.randint(3, 8)
-            
-            for i in range(num_flights):
-                # Price variation based on time and demand
-                price_multiplier = random.uniform(0.7, 1.8)
-                
-                # Weekend premium
-                if current_date.weekday() >= 5:
-                    price_multiplier *= 1.2
-                
-                # Peak hours premium
-                hour = random.randint(6, 22)
-                if hour in [7, 8, 17, 18, 19]:
-                    price_multiplier *= 1.15
-                
-                flight = {
-                    'price': round(base_price * price_multiplier),
-                    'origin': origin.upper(),
-                    'destination': destination.upper(),
-                    'date': current_date.strftime('%Y-%m-%d'),
-                    'time': f"{hour:02d}:{random.randint(0, 59):02d}",
-                    'airline': random.choice(['Jetstar', 'Virgin Australia', 'Qantas', 'Tiger Airways']),
-                    'direct': random.choice([True, True, False]),  # 2/3 chance of direct
-                    'duration': random.randint(90, 300),  # minutes
-                    'source': 'sample_data',
-                    'demand_score': random.uniform(0.3, 1.0)
-                }
-                flights.append(flight)
-            
-            current_date += timedelta(days=1)
+        days = pd.date_range(start_date, end_date, freq='D')
+        if days.empty:
+            return []
+        
+        # Draw every random value for the whole range in one batch per column
+        rng = self.rng
+        num_flights_per_day = rng.integers(3, 9, size=len(days))  # 3-8 flights per day
+        total = int(num_flights_per_day.sum())
+        
+        dates = np.repeat(days.strftime('%Y-%m-%d').to_numpy(), num_flights_per_day)
+        weekend_mask = np.repeat(days.weekday >= 5, num_flights_per_day)
+        
+        # Price variation based on time and demand
+        price_multiplier = rng.uniform(0.7, 1.8, total)
+        hours = rng.integers(6, 23, total)
+        minutes = rng.integers(0, 60, total)
+        
+        # Weekend and peak hours premiums
+        if NUMBA_AVAILABLE and total >= JIT_MIN_SIZE:
+            prices = sample_prices(float(base_price), price_multiplier, weekend_mask, hours)
+        else:
+            price_multiplier[weekend_mask] *= 1.2
+            price_multiplier[np.isin(hours, _PEAK_HOURS)] *= 1.15
+            prices = np.round(base_price * price_multiplier).astype(int)
         
-        return flights
+        flights = pd.DataFrame({
+            'price': prices,
+            'origin': origin.upper(),
+            'destination': destination.upper(),
+            'date': dates,
+            'time': [f"{h:02d}:{m:02d}" for h, m in zip(hours.tolist(), minutes.tolist())],
+            'airline': rng.choice(_AIRLINES, total),
+            'direct': rng.choice(_DIRECT_CHOICES, total),
+            'duration': rng.integers(90, 301, total),  # minutes
+            'source': 'sample_data',
+            'demand_score': rng.uniform(0.3, 1.0, total)
+        })
+        
+        return flights.to_dict('records')
     
     def _collect_market_trends(self) -> Dict:
+        """Return market trends, served from memory, Redis or disk while younger than MARKET_TRENDS_TTL"""
+
+        if self._market_cache['data'] and time.time() - self._market_cache['ts'] < MARKET_TRENDS_TTL:
+            return self._market_cache['data']
+
+        cached = cache_get('market_trends')
+        if cached is not None:
+            self._market_cache = cached
+            return cached['data']
+
+        try:
+            cached_ts = os.path.getmtime(self.market_cache_file)
+            if time.time() - cached_ts < MARKET_TRENDS_TTL:
+                with open(self.market_cache_file, 'rb') as f:
+                    self._market_cache = {'ts': cached_ts, 'data': orjson.loads(f.read())}
+                return self._market_cache['data']
+        except (OSError, ValueError):
+            pass
+
+        market_data = self._build_market_trends()
+        self._market_cache = {'ts': time.time(), 'data': market_data}
+        cache_set('market_trends', MARKET_TRENDS_TTL, self._market_cache)
+        try:
+            with open(self.market_cache_file, 'wb') as f:
+                f.write(orjson.dumps(market_data))
+        except Exception as e:
+            logger.warning(f"Failed to persist market trends: {str(e)}")
+        return market_data
+
+    def _build_market_trends(self) -> Dict:
         """Collect general market trend data and enrich with public scrape if available"""
 
         # Base sample market data (fallback)
@@ -213,26 +362,17 @@ class DataCollector:
         """Scrape Wikipedia for busiest Australian domestic air routes and map to IATA codes.
         Returns a list like: [{'route': 'SYD-MEL', 'volume': 900, 'trend': 'up'}]
         """
-        url_candidates = [
-            'https://en.wikipedia.org/wiki/List_of_busiest_air_routes_in_Australia',
-            'https://en.wikipedia.org/wiki/List_of_the_busiest_air_routes'
-        ]
-        city_to_iata = {
-            'sydney': 'SYD', 'melbourne': 'MEL', 'brisbane': 'BNE', 'perth': 'PER',
-            'adelaide': 'ADL', 'canberra': 'CBR', 'darwin': 'DRW', 'hobart': 'HBA',
-            'gold coast': 'OOL'
-        }
         results: List[Dict] = []
-        for url in url_candidates:
+        # Fetch every candidate concurrently, then parse in priority order
+        for url, html in zip(_WIKIPEDIA_ROUTE_URLS, self._fetch_all(_WIKIPEDIA_ROUTE_URLS)):
+            if html is None:
+                continue
             try:
-                resp = requests.get(url, timeout=10)
-                if resp.status_code != 200:
-                    continue
-                soup = BeautifulSoup(resp.text, 'lxml')
-                tables = soup.select('table.wikitable')
+                tree = LexborHTMLParser(html)
+                tables = tree.css('table.wikitable')
                 for table in tables:
-                    for tr in table.select('tr')[1:]:
-                        tds = [td.get_text(strip=True) for td in tr.select('td')]
+                    for tr in table.css('tr')[1:]:
+                        tds = [td.text(strip=True) for td in tr.css('td')]
                         if len(tds) < 2:
                             continue
                         # Try to extract a route like "Sydney–Melbourne" and a volume number
@@ -244,15 +384,8 @@ class DataCollector:
                         if len(parts) != 2:
                             continue
                         a, b = parts[0], parts[1]
-                        a_iata = city_to_iata.get(a, None)
-                        b_iata = city_to_iata.get(b, None)
-                        if not (a_iata and b_iata):
-                            # Try contains (e.g., 'sydney (domestic)')
-                            for city, code in city_to_iata.items():
-                                if city in a and not a_iata:
-                                    a_iata = code
-                                if city in b and not b_iata:
-                                    b_iata = code
+                        a_iata = _city_to_iata(a)
+                        b_iata = _city_to_iata(b)
                         if a_iata and b_iata:
                             volume = int(vol_text) if vol_text.isdigit() else None
                             results.append({'route': f'{a_iata}-{b_iata}', 'volume': volume or 0, 'trend': 'up'})
@@ -267,39 +400,107 @@ class DataCollector:
             unique[r['route']] = r
         return list(unique.values())[:10]
 
+    def _fetch_all(self, urls: Sequence[str]) -> List[Optional[bytes]]:
+        """GET several URLs concurrently; returns raw page bytes per URL, or None on failure"""
+
+        def fetch(url: str) -> Optional[bytes]:
+            try:
+                resp = self.session.get(url, timeout=10)
+                return resp.content if resp.status_code == 200 else None
+            except Exception as e:
+                logger.debug(f"Fetch failed for {url}: {e}")
+                return None
+
+        return list(_fetch_pool.map(fetch, urls))
+
     def _cache_data(self, data: Dict) -> None:
         """Cache collected data for future use"""
 
+        cache_set(_flight_cache_key(data['search_params']), FLIGHT_DATA_CACHE_TTL, data)
+
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        cache_file = os.path.join(self.cache_dir, f'flight_data_{timestamp}.json')
+        cache_file = os.path.join(self.cache_dir, f'flight_data_{timestamp}.json.gz')
 
         try:
-            with open(cache_file, 'w') as f:
-                json.dump(data, f, indent=2)
+            # Skip the write when nothing but the collection timestamp changed since this process's
+            # last write (e.g. repeated API responses; freshly drawn sample data always differs)
+            content = {k: v for k, v in data.items() if k != 'collection_timestamp'}
+            content_hash = hashlib.blake2b(
+                orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY), digest_size=16
+            ).hexdigest()
+            if content_hash == self._last_cache_hash:
+                logger.info("Collected data unchanged; skipping cache write")
+                return
+
+            body = orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY)
+            payload = gzip.compress(body, compresslevel=CACHE_COMPRESS_LEVEL)
+            # Unique temp file: cache_file names have one-second resolution and writers run concurrently
+            tmp_file = _write_temp_file(self.cache_dir, payload)
+            try:
+                os.replace(tmp_file, cache_file)
+            except OSError:
+                os.remove(tmp_file)
+                raise
+            self._last_cache_hash = content_hash
+            self._update_latest(cache_file, payload)
+            self._prune_cache()
             logger.info(f"Data cached to {cache_file}")
         except Exception as e:
             logger.error(f"Failed to cache data: {str(e)}")
 
-    def get_cached_data(self, max_age_hours: int = 24) -> Optional[Dict]:
-        """Retrieve recent cached data if available"""
+    def _update_latest(self, cache_file: str, payload: bytes) -> None:
+        """Atomically point latest.json.gz at the newest cache file"""
 
+        # Unique temp name per call: request threads and gunicorn workers update latest concurrently
+        tmp_path = os.path.join(self.cache_dir, f'.latest.{uuid.uuid4().hex}.tmp')
         try:
-            cache_files = [f for f in os.listdir(self.cache_dir) if f.startswith('flight_data_')]
-            if not cache_files:
-                return None
+            os.link(cache_file, tmp_path)
+        except OSError as e:
+            if e.errno not in _NO_HARDLINK_ERRNOS:
+                raise
+            # Filesystem without hardlinks; fall back to a fresh copy (never write through a link)
+            tmp_path = _write_temp_file(self.cache_dir, payload)
+        try:
+            os.replace(tmp_path, os.path.join(self.cache_dir, 'latest.json.gz'))
+        except OSError:
+            os.remove(tmp_path)
+            raise
+
+    def _prune_cache(self, keep: int = CACHE_KEEP_FILES) -> None:
+        """Delete all but the newest `keep` timestamped cache files"""
+
+        # Only finished snapshots count; in-flight temp files are left to their writers
+        cache_files = sorted(f for f in os.listdir(self.cache_dir)
+                             if f.startswith('flight_data_') and f.endswith('.json.gz'))
+        for stale in cache_files[:-keep]:
+            try:
+                os.remove(os.path.join(self.cache_dir, stale))
+            except OSError as e:
+                logger.debug(f"Failed to prune {stale}: {e}")
 
-            # Get most recent cache file
-            latest_file = max(cache_files)
-            cache_path = os.path.join(self.cache_dir, latest_file)
+    def get_cached_data(self, max_age_hours: int = 24, search_params: Optional[Dict] = None) -> Optional[Dict]:
+        """Retrieve recent cached data if available, optionally only for the given search"""
 
+        if search_params:
+            cached = cache_get(_flight_cache_key(search_params))
+            if cached is not None:
+                return cached
+
+        cache_path = os.path.join(self.cache_dir, 'latest.json.gz')
+        try:
             # Check if cache is still fresh
-            file_time = os.path.getmtime(cache_path)
+            file_time = os.stat(cache_path).st_mtime
             if time.time() - file_time > max_age_hours * 3600:
                 return None
 
-            with open(cache_path, 'r') as f:
-                return json.load(f)
+            with open(cache_path, 'rb') as f:
+                data = orjson.loads(gzip.decompress(f.read()))
+            if search_params and _flight_cache_key(data.get('search_params', {})) != _flight_cache_key(search_params):
+                return None
+            return data
 
+        except FileNotFoundError:
+            return None
         except Exception as e:
             logger.error(f"Failed to load cached data: {str(e)}")
             return None
@@ -6,13 +6,209 @@ Handles cleaning, analysis, and processing of collected airline data
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-from typing import Dict, List, Tuple
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+from types import MappingProxyType
 import logging
-import json
+import orjson
+import hashlib
+import calendar
+import gzip
 import os
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from .cache import redis_memoize
+except ImportError:
+    from cache import redis_memoize
+
+try:
+    from ._numba_kernels import NUMBA_AVAILABLE, JIT_MIN_SIZE
+except ImportError:
+    from _numba_kernels import NUMBA_AVAILABLE, JIT_MIN_SIZE
+
+if NUMBA_AVAILABLE:
+    try:
+        from ._numba_kernels import group_stats
+    except ImportError:
+        from _numba_kernels import group_stats
+
+try:
+    import pyarrow  # noqa: F401 - only needed to enable Arrow-backed string columns
+    STRING_DTYPE = 'string[pyarrow]'
+except ImportError:  # pyarrow is optional; string columns stay NumPy object/str dtype
+    STRING_DTYPE = None
+
 
 logger = logging.getLogger(__name__)
 
+# Names for the int8 weekday (0=Monday) and month (1-12) codes, applied only at output
+DAY_NAMES = tuple(calendar.day_name)
+MONTH_NAMES = tuple(calendar.month_name)
+
+# orjson flags for saved results: NumPy values and date-keyed daily counts serialize natively
+SAVE_JSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+# Columns that identify a unique flight record
+_DEDUPE_KEYS = ('airline', 'origin', 'destination', 'date', 'price', 'time', 'flight_number')
+
+# Low-cardinality string columns stored as categoricals after cleaning
+CATEGORY_COLUMNS = ('origin', 'destination', 'airline', 'route')
+
+# String key columns that several analyses group on
+GROUP_KEY_COLUMNS = ('route', 'airline')
+
+# Below this many rows Dask's scheduling overhead outweighs parallel cleaning
+DASK_MIN_ROWS = 100_000
+
+# Static trend and sample data, built once and shared read-only across requests
+_TRENDING_ROUTES = tuple(MappingProxyType(r) for r in (
+    {'route': 'SYD-MEL', 'trend': 'up', 'change': '+12%', 'volume': 1250},
+    {'route': 'MEL-SYD', 'trend': 'stable', 'change': '+2%', 'volume': 1180},
+    {'route': 'SYD-BNE', 'trend': 'down', 'change': '-8%', 'volume': 890},
+    {'route': 'BNE-SYD', 'trend': 'up', 'change': '+15%', 'volume': 845},
+    {'route': 'MEL-BNE', 'trend': 'stable', 'change': '+1%', 'volume': 650}
+))
+
+_PRICE_TRENDS = MappingProxyType({
+    'overall_trend': 'increasing',
+    'monthly_change': '+5.2%',
+    'seasonal_patterns': MappingProxyType({
+        'peak_season': 'December-January',
+        'low_season': 'February-March',
+        'price_difference': '25-30%'
+    }),
+    'forecast': MappingProxyType({
+        'next_month': '+3%',
+        'next_quarter': '+8%'
+    })
+})
+
+_SAMPLE_DATA = MappingProxyType({
+    'popular_routes': tuple(MappingProxyType(r) for r in (
+        {'route': 'SYD-MEL', 'flights': 45, 'avg_price': 165},
+        {'route': 'MEL-SYD', 'flights': 42, 'avg_price': 158},
+        {'route': 'SYD-BNE', 'flights': 28, 'avg_price': 220}
+    )),
+    'price_trends': MappingProxyType({
+        'this_week': 185,
+        'last_week': 178,
+        'change': '+3.9%'
+    })
+})
+
+# TTL for memoized sub-analyses (seconds)
+ANALYSIS_CACHE_TTL = 600
+
+@functools.lru_cache(maxsize=1)
+def _dask_dataframe():
+    """dask.dataframe, imported on first use so workers that never use Dask skip its import cost"""
+    try:
+        import dask.dataframe as dd
+    except ImportError:  # Dask is optional; process_data falls back to the pandas engine
+        return None
+    return dd
+
+def _frame_hash(df: pd.DataFrame, columns: List[str]) -> str:
+    """Content hash of the given DataFrame columns, for cache keys"""
+    present = [c for c in columns if c in df.columns]
+    hashed = pd.util.hash_pandas_object(df[present], index=False).to_numpy()
+    return hashlib.sha1(hashed.tobytes()).hexdigest()
+
+def _factorize_keys(df: pd.DataFrame) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+    """Factorize each grouping key column once, for reuse by every analysis that groups on it"""
+    return {c: pd.factorize(df[c], sort=True) for c in GROUP_KEY_COLUMNS if c in df.columns}
+
+def _group_price_stats(df: pd.DataFrame, key: str, factorized: Optional[Tuple] = None) -> pd.DataFrame:
+    """Per-group flight count, avg/min/max price and direct ratio (if available), in key order"""
+    codes, uniques = factorized if factorized is not None else pd.factorize(df[key], sort=True)
+    ngroups = len(uniques)
+    prices = df['price'].to_numpy(dtype=np.float64)
+    has_direct = 'direct' in df.columns
+    direct = df['direct'].to_numpy(dtype=np.float64) if has_direct else np.zeros(len(df))
+    # Missing direct flags are skipped in the direct ratio, as a pandas mean would
+    direct_valid = ~np.isnan(direct)
+    direct = np.where(direct_valid, direct, 0.0)
+    
+    # Rows with a missing key (code -1) are dropped, as groupby would
+    valid = codes >= 0
+    if not valid.all():
+        codes, prices, direct, direct_valid = codes[valid], prices[valid], direct[valid], direct_valid[valid]
+    
+    if NUMBA_AVAILABLE and len(codes) >= JIT_MIN_SIZE:
+        count, price_sum, price_min, price_max, direct_sum, direct_count = group_stats(
+            codes, prices, direct, direct_valid, ngroups)
+    else:
+        count = np.bincount(codes, minlength=ngroups)
+        price_sum = np.bincount(codes, weights=prices, minlength=ngroups)
+        direct_sum = np.bincount(codes, weights=direct, minlength=ngroups)
+        direct_count = np.bincount(codes, weights=direct_valid, minlength=ngroups)
+        price_min = np.full(ngroups, np.inf)
+        price_max = np.full(ngroups, -np.inf)
+        np.minimum.at(price_min, codes, prices)
+        np.maximum.at(price_max, codes, prices)
+    
+    stats = pd.DataFrame({
+        key: uniques,
+        'flight_count': count,
+        'avg_price': price_sum / count,
+        'min_price': price_min,
+        'max_price': price_max
+    })
+    if has_direct:
+        # Groups with no known direct flags get NaN, like the mean of an all-NaN group
+        stats['direct_ratio'] = np.divide(direct_sum, direct_count,
+                                          out=np.full(ngroups, np.nan), where=direct_count > 0)
+    
+    return stats.round(2)
+
+def _clean_partition(df: pd.DataFrame) -> pd.DataFrame:
+    """Clean and standardize a frame of flight data (module level so Dask workers can pickle it)"""
+    
+    # Remove duplicates, hashing only the columns that identify a flight
+    keys = [c for c in _DEDUPE_KEYS if c in df.columns]
+    df = df.drop_duplicates(subset=keys or None, keep='first')
+    
+    # Ensure required columns exist
+    required_columns = ['price', 'origin', 'destination', 'date']
+    for col in required_columns:
+        if col not in df.columns:
+            df[col] = None
+    
+    # Clean price data
+    df['price'] = pd.to_numeric(df['price'], errors='coerce')
+    df = df.dropna(subset=['price'])
+    df = df[df['price'] > 0]
+    
+    # Standardize airport codes (Arrow strings run upper/concat as vectorized UTF-8 kernels)
+    if STRING_DTYPE:
+        df['origin'] = df['origin'].astype(STRING_DTYPE)
+        df['destination'] = df['destination'].astype(STRING_DTYPE)
+    df['origin'] = df['origin'].str.upper()
+    df['destination'] = df['destination'].str.upper()
+    
+    # Parse dates (collectors emit ISO-8601 'YYYY-MM-DD', which takes pandas' C fast path)
+    df['date'] = pd.to_datetime(df['date'], format='ISO8601', errors='coerce', cache=True)
+    df = df.dropna(subset=['date'])
+    
+    # Add derived columns
+    df['weekday'] = df['date'].dt.weekday.astype(np.int8)
+    df['month_num'] = df['date'].dt.month.astype(np.int8)
+    df['is_weekend'] = df['weekday'] >= 5
+    
+    # Add route column
+    df['route'] = df['origin'] + '-' + df['destination']
+    
+    return df
+
+def _compact_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """Downcast cleaned columns: float32 prices and categorical string keys"""
+    df['price'] = df['price'].astype(np.float32)
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    return df
+
 class DataProcessor:
     """Processes and analyzes airline booking data"""
     
@@ -20,8 +216,8 @@ class DataProcessor:
         self.processed_data_dir = 'data/processed'
         os.makedirs(self.processed_data_dir, exist_ok=True)
     
-    def process_data(self, raw_data: Dict) -> Dict:
-        """Main method to process raw flight data"""
+    def process_data(self, raw_data: Dict, engine: str = 'pandas') -> Dict:
+        """Main method to process raw flight data (engine='dask' parallelizes cleaning of large inputs)"""
         
         logger.info("Processing flight data...")
         
@@ -32,22 +228,29 @@ class DataProcessor:
         df = pd.DataFrame(raw_data['flights'])
         
         # Clean and standardize the data
-        df_clean = self._clean_data(df)
-        
-        # Perform analysis
-        analysis = {
-            'summary': self._generate_summary(df_clean),
-            'price_analysis': self._analyze_prices(df_clean),
-            'route_analysis': self._analyze_routes(df_clean),
-            'time_analysis': self._analyze_time_patterns(df_clean),
-            'demand_analysis': self._analyze_demand(df_clean),
-            'airline_analysis': self._analyze_airlines(df_clean)
+        if engine == 'dask' and len(df) >= DASK_MIN_ROWS and _dask_dataframe() is not None:
+            df_clean = self._clean_data_dask(df)
+        else:
+            df_clean = self._clean_data(df)
+        
+        # Perform analysis; each stage only reads df_clean, so they run concurrently
+        group_codes = _factorize_keys(df_clean)
+        stages = {
+            'summary': (self._generate_summary, {}),
+            'price_analysis': (self._analyze_prices, {}),
+            'route_analysis': (self._analyze_routes, {'group_codes': group_codes}),
+            'time_analysis': (self._analyze_time_patterns, {}),
+            'demand_analysis': (self._analyze_demand, {'group_codes': group_codes}),
+            'airline_analysis': (self._analyze_airlines, {'group_codes': group_codes})
         }
+        with ThreadPoolExecutor(max_workers=min(len(stages), os.cpu_count() or 1)) as executor:
+            futures = {name: executor.submit(stage, df_clean, **kwargs) for name, (stage, kwargs) in stages.items()}
+        analysis = {name: future.result() for name, future in futures.items()}
         
         # Combine with market data
         processed_data = {
             'search_params': raw_data.get('search_params', {}),
-            'flights_data': df_clean.to_dict('records'),
+            'flights_data_columns': {c: df_clean[c].tolist() for c in df_clean.columns},
             'analysis': analysis,
             'market_data': raw_data.get('market_data', {}),
             'processing_timestamp': datetime.now().isoformat(),
@@ -62,41 +265,26 @@ class DataProcessor:
     def _clean_data(self, df: pd.DataFrame) -> pd.DataFrame:
         """Clean and standardize the flight data"""
         
-        # Remove duplicates
-        df = df.drop_duplicates()
-        
-        # Ensure required columns exist
-        required_columns = ['price', 'origin', 'destination', 'date']
-        for col in required_columns:
-            if col not in df.columns:
-                df[col] = None
-        
-        # Clean price data
-        df['price'] = pd.to_numeric(df['price'], errors='coerce')
-        df = df.dropna(subset=['price'])
-        df = df[df['price'] > 0]
-        
-        # Standardize airport codes
-        df['origin'] = df['origin'].str.upper()
-        df['destination'] = df['destination'].str.upper()
-        
-        # Parse dates
-        df['date'] = pd.to_datetime(df['date'], errors='coerce')
-        df = df.dropna(subset=['date'])
+        return _compact_dtypes(_clean_partition(df)).reset_index(drop=True)
+    
+    def _clean_data_dask(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Clean the flight data partition-by-partition across cores with Dask"""
         
-        # Add derived columns
-        df['day_of_week'] = df['date'].dt.day_name()
-        df['month'] = df['date'].dt.month_name()
-        df['is_weekend'] = df['date'].dt.weekday >= 5
+        ddf = _dask_dataframe().from_pandas(df, npartitions=os.cpu_count() or 1)
+        df_clean = ddf.map_partitions(_clean_partition, meta=_clean_partition(df.iloc[:0])).compute()
         
-        # Add route column
-        df['route'] = df['origin'] + '-' + df['destination']
+        # Partitions only dedupe locally; drop duplicates that straddled a boundary
+        keys = [c for c in _DEDUPE_KEYS if c in df_clean.columns]
+        df_clean = df_clean.drop_duplicates(subset=keys or None, keep='first')
         
-        return df
+        # Categories are assigned after combining so every partition shares one set of codes
+        return _compact_dtypes(df_clean).reset_index(drop=True)
     
     def _generate_summary(self, df: pd.DataFrame) -> Dict:
         """Generate summary statistics"""
         
+        # Accumulate in float64; the stored float32 prices are only for compact storage
+        prices = df['price'].astype(np.float64)
         return {
             'total_flights': len(df),
             'unique_routes': df['route'].nunique(),
@@ -105,30 +293,33 @@ class DataProcessor:
                 'end': df['date'].max().strftime('%Y-%m-%d')
             },
             'price_range': {
-                'min': float(df['price'].min()),
-                'max': float(df['price'].max()),
-                'avg': float(df['price'].mean()),
-                'median': float(df['price'].median())
+                'min': float(prices.min()),
+                'max': float(prices.max()),
+                'avg': float(prices.mean()),
+                'median': float(prices.median())
             },
             'airlines': df['airline'].nunique() if 'airline' in df.columns else 0
         }
     
+    @redis_memoize(ttl=ANALYSIS_CACHE_TTL,
+                   key_fn=lambda df: _frame_hash(df, ['price', 'weekday', 'month_num', 'is_weekend']))
     def _analyze_prices(self, df: pd.DataFrame) -> Dict:
         """Analyze price patterns and trends"""
         
+        prices = df['price'].astype(np.float64)
         price_analysis = {
             'statistics': {
-                'mean': float(df['price'].mean()),
-                'median': float(df['price'].median()),
-                'std': float(df['price'].std()),
-                'min': float(df['price'].min()),
-                'max': float(df['price'].max())
+                'mean': float(prices.mean()),
+                'median': float(prices.median()),
+                'std': float(prices.std()),
+                'min': float(prices.min()),
+                'max': float(prices.max())
             },
-            'by_day_of_week': df.groupby('day_of_week')['price'].mean().to_dict(),
-            'by_month': df.groupby('month')['price'].mean().to_dict(),
+            'by_day_of_week': {DAY_NAMES[d]: v for d, v in prices.groupby(df['weekday']).mean().items()},
+            'by_month': {MONTH_NAMES[m]: v for m, v in prices.groupby(df['month_num']).mean().items()},
             'weekend_premium': {
-                'weekend_avg': float(df[df['is_weekend']]['price'].mean()),
-                'weekday_avg': float(df[~df['is_weekend']]['price'].mean())
+                'weekend_avg': float(prices[df['is_weekend']].mean()),
+                'weekday_avg': float(prices[~df['is_weekend']].mean())
             }
         }
         
@@ -141,41 +332,36 @@ class DataProcessor:
         
         return price_analysis
     
-    def _analyze_routes(self, df: pd.DataFrame) -> Dict:
+    @redis_memoize(ttl=ANALYSIS_CACHE_TTL,
+                   key_fn=lambda df: _frame_hash(df, ['route', 'price', 'direct']))
+    def _analyze_routes(self, df: pd.DataFrame, group_codes: Optional[Dict] = None) -> Dict:
         """Analyze route popularity and characteristics"""
 
-        # Check if 'direct' column exists
-        agg_dict = {'price': ['count', 'mean', 'min', 'max']}
-        if 'direct' in df.columns:
-            agg_dict['direct'] = 'mean'
-
-        route_stats = df.groupby('route').agg(agg_dict).round(2)
-        
-        # Set column names based on what columns we have
-        if 'direct' in df.columns:
-            route_stats.columns = ['flight_count', 'avg_price', 'min_price', 'max_price', 'direct_ratio']
-        else:
-            route_stats.columns = ['flight_count', 'avg_price', 'min_price', 'max_price']
-        route_stats = route_stats.reset_index()
+        route_stats = _group_price_stats(df, 'route', (group_codes or {}).get('route'))
         
-        # Sort by flight count (popularity)
-        route_stats = route_stats.sort_values('flight_count', ascending=False)
+        # Select the 10 most popular routes without a full sort; ties keep route (key) order
+        top = route_stats.nlargest(10, 'flight_count', keep='first')
         
+        avg_prices = route_stats['avg_price'].to_numpy()
         return {
-            'popular_routes': route_stats.head(10).to_dict('records'),
+            'popular_routes': top.to_dict('records'),
             'total_routes': len(route_stats),
-            'most_expensive_route': route_stats.loc[route_stats['avg_price'].idxmax()].to_dict(),
-            'cheapest_route': route_stats.loc[route_stats['avg_price'].idxmin()].to_dict()
+            'most_expensive_route': route_stats.iloc[avg_prices.argmax()].to_dict(),
+            'cheapest_route': route_stats.iloc[avg_prices.argmin()].to_dict()
         }
     
+    @redis_memoize(ttl=ANALYSIS_CACHE_TTL,
+                   key_fn=lambda df: _frame_hash(df, ['date', 'price', 'weekday']))
     def _analyze_time_patterns(self, df: pd.DataFrame) -> Dict:
         """Analyze time-based patterns"""
         
-        # Daily flight counts
-        daily_counts = df.groupby(df['date'].dt.date)['price'].count()
+        # Daily flight counts, bucketed on the int64 timestamps; days without flights are dropped
+        daily_counts = df.set_index('date')['price'].sort_index().resample('D').count()
+        daily_counts = daily_counts[daily_counts > 0]
+        daily_counts.index = daily_counts.index.date
         
         # Weekly patterns
-        weekly_pattern = df.groupby('day_of_week')['price'].count().to_dict()
+        weekly_pattern = {DAY_NAMES[d]: n for d, n in df.groupby('weekday')['price'].count().items()}
         
         return {
             'daily_flight_counts': daily_counts.to_dict(),
@@ -185,7 +371,7 @@ class DataProcessor:
             'avg_flights_per_day': float(daily_counts.mean())
         }
     
-    def _analyze_demand(self, df: pd.DataFrame) -> Dict:
+    def _analyze_demand(self, df: pd.DataFrame, group_codes: Optional[Dict] = None) -> Dict:
         """Analyze demand patterns"""
         
         demand_analysis = {
@@ -197,7 +383,12 @@ class DataProcessor:
         # If demand_score is available
         if 'demand_score' in df.columns:
             # High demand routes (top 20% by demand score)
-            route_demand = df.groupby('route')['demand_score'].mean().sort_values(ascending=False)
+            codes, routes = (group_codes or {}).get('route') or pd.factorize(df['route'], sort=True)
+            # Rows with a missing route (code -1) are dropped, as groupby would
+            valid = codes >= 0
+            route_demand = pd.Series(df['demand_score'].to_numpy()[valid]).groupby(codes[valid]).mean()
+            route_demand.index = routes[route_demand.index]
+            route_demand = route_demand.sort_values(ascending=False)
             high_demand_threshold = route_demand.quantile(0.8)
             demand_analysis['high_demand_routes'] = route_demand[route_demand >= high_demand_threshold].to_dict()
             
@@ -206,8 +397,8 @@ class DataProcessor:
         
         # Peak times based on flight frequency
         if 'time' in df.columns:
-            df['hour'] = pd.to_datetime(df['time'], format='%H:%M', errors='coerce').dt.hour
-            hourly_counts = df.groupby('hour')['price'].count()
+            hours = pd.to_datetime(df['time'], format='%H:%M', errors='coerce', cache=True).dt.hour.rename('hour')
+            hourly_counts = df['price'].groupby(hours).count()
             demand_analysis['peak_times'] = {
                 'busiest_hour': int(hourly_counts.idxmax()),
                 'quietest_hour': int(hourly_counts.idxmin()),
@@ -216,81 +407,46 @@ class DataProcessor:
         
         return demand_analysis
     
-    def _analyze_airlines(self, df: pd.DataFrame) -> Dict:
+    def _analyze_airlines(self, df: pd.DataFrame, group_codes: Optional[Dict] = None) -> Dict:
         """Analyze airline-specific patterns"""
         
         if 'airline' not in df.columns:
             return {'message': 'No airline data available'}
         
-        airline_stats = df.groupby('airline').agg({
-            'price': ['count', 'mean', 'min', 'max'],
-            'direct': 'mean'
-        }).round(2)
-        
-        airline_stats.columns = ['flight_count', 'avg_price', 'min_price', 'max_price', 'direct_ratio']
-        airline_stats = airline_stats.reset_index()
-        airline_stats = airline_stats.sort_values('flight_count', ascending=False)
+        airline_stats = _group_price_stats(df, 'airline', (group_codes or {}).get('airline'))
+        airline_stats = airline_stats.sort_values('flight_count', ascending=False, kind='stable')
         
+        airlines = airline_stats['airline'].tolist()
+        avg_prices = airline_stats['avg_price'].to_numpy()
         return {
             'airline_rankings': airline_stats.to_dict('records'),
-            'most_flights': airline_stats.iloc[0]['airline'],
-            'cheapest_airline': airline_stats.loc[airline_stats['avg_price'].idxmin()]['airline'],
-            'most_expensive_airline': airline_stats.loc[airline_stats['avg_price'].idxmax()]['airline']
+            'most_flights': airlines[0],
+            'cheapest_airline': airlines[avg_prices.argmin()],
+            'most_expensive_airline': airlines[avg_prices.argmax()]
         }
     
-    def get_trending_routes(self) -> List[Dict]:
+    def get_trending_routes(self) -> Sequence[Mapping]:
         """Get trending route information"""
         
-        # Sample trending data
-        trending_routes = [
-            {'route': 'SYD-MEL', 'trend': 'up', 'change': '+12%', 'volume': 1250},
-            {'route': 'MEL-SYD', 'trend': 'stable', 'change': '+2%', 'volume': 1180},
-            {'route': 'SYD-BNE', 'trend': 'down', 'change': '-8%', 'volume': 890},
-            {'route': 'BNE-SYD', 'trend': 'up', 'change': '+15%', 'volume': 845},
-            {'route': 'MEL-BNE', 'trend': 'stable', 'change': '+1%', 'volume': 650}
-        ]
-        
-        return trending_routes
+        return _TRENDING_ROUTES
     
-    def get_price_trends(self) -> Dict:
+    def get_price_trends(self) -> Mapping:
         """Get price trend analysis"""
         
-        return {
-            'overall_trend': 'increasing',
-            'monthly_change': '+5.2%',
-            'seasonal_patterns': {
-                'peak_season': 'December-January',
-                'low_season': 'February-March',
-                'price_difference': '25-30%'
-            },
-            'forecast': {
-                'next_month': '+3%',
-                'next_quarter': '+8%'
-            }
-        }
+        return _PRICE_TRENDS
     
     def get_sample_data(self) -> Dict:
         """Get sample data for API endpoints"""
         
-        return {
-            'popular_routes': [
-                {'route': 'SYD-MEL', 'flights': 45, 'avg_price': 165},
-                {'route': 'MEL-SYD', 'flights': 42, 'avg_price': 158},
-                {'route': 'SYD-BNE', 'flights': 28, 'avg_price': 220}
-            ],
-            'price_trends': {
-                'this_week': 185,
-                'last_week': 178,
-                'change': '+3.9%'
-            }
-        }
+        # Shallow copy so JSON endpoint callers get a plain dict; nested values stay shared
+        return dict(_SAMPLE_DATA)
     
     def _get_empty_processed_data(self) -> Dict:
         """Return empty processed data structure"""
         
         return {
             'search_params': {},
-            'flights_data': [],
+            'flights_data_columns': {},
             'analysis': {
                 'summary': {'total_flights': 0},
                 'price_analysis': {},
@@ -305,15 +461,20 @@ class DataProcessor:
         }
     
     def _save_processed_data(self, data: Dict) -> None:
-        """Save processed data to file"""
+        """Save processed data to file (gzipped compact JSON; FLIGHT_ANALYSIS_JSON_INDENT=1 for readable output)"""
         
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f'processed_data_{timestamp}.json'
+        readable = os.getenv('FLIGHT_ANALYSIS_JSON_INDENT') == '1'
+        filename = f'processed_data_{timestamp}.json' if readable else f'processed_data_{timestamp}.json.gz'
         filepath = os.path.join(self.processed_data_dir, filename)
         
         try:
-            with open(filepath, 'w') as f:
-                json.dump(data, f, indent=2, default=str)
+            if readable:
+                with open(filepath, 'wb') as f:
+                    f.write(orjson.dumps(data, default=str, option=SAVE_JSON_OPTIONS | orjson.OPT_INDENT_2))
+            else:
+                with gzip.open(filepath, 'wb', compresslevel=1) as f:
+                    f.write(orjson.dumps(data, default=str, option=SAVE_JSON_OPTIONS))
             logger.info(f"Processed data saved to {filepath}")
         except Exception as e:
             logger.error(f"Failed to save processed data: {str(e)}")
@@ -5,15 +5,46 @@ Creates charts and graphs for airline booking data visualization
 
 import plotly.graph_objects as go
 import plotly.express as px
-from plotly.utils import PlotlyJSONEncoder
-import json
+import numpy as np
 import pandas as pd
 from typing import Dict, List
 import logging
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+@functools.lru_cache(maxsize=16)
+def _empty_chart_json(message: str) -> str:
+    """Placeholder chart JSON for a message, built once per distinct message"""
+    
+    fig = go.Figure()
+    fig.add_annotation(
+        text=message,
+        xref="paper", yref="paper",
+        x=0.5, y=0.5,
+        showarrow=False,
+        font=dict(size=16)
+    )
+    
+    fig.update_layout(
+        title='No Data Available',
+        template='plotly_white',
+        xaxis=dict(showgrid=False, showticklabels=False),
+        yaxis=dict(showgrid=False, showticklabels=False)
+    )
+    
+    return fig.to_json(validate=False)
+
+def _flights_frame(data: Dict) -> pd.DataFrame:
+    """Flights as a DataFrame with parsed dates, from columnar or legacy per-flight records"""
+    columns = data.get('flights_data_columns')
+    df = pd.DataFrame(columns if columns is not None else data.get('flights_data', []))
+    if 'date' in df.columns:
+        df['date'] = pd.to_datetime(df['date'])
+    return df
+
 class DataVisualizer:
     """Creates interactive visualizations for airline booking data"""
     
@@ -31,52 +62,52 @@ class DataVisualizer:
         charts = {}
         
         try:
-            # Price trend chart
-            charts['price_trends'] = self._create_price_trend_chart(processed_data)
-            
-            # Route popularity chart
-            charts['route_popularity'] = self._create_route_popularity_chart(processed_data)
-            
-            # Weekly pattern chart
-            charts['weekly_patterns'] = self._create_weekly_pattern_chart(processed_data)
-            
-            # Price distribution chart
-            charts['price_distribution'] = self._create_price_distribution_chart(processed_data)
-            
-            # Airline comparison chart
-            charts['airline_comparison'] = self._create_airline_comparison_chart(processed_data)
-            
-            # Daily flight volume chart
-            charts['daily_volume'] = self._create_daily_volume_chart(processed_data)
-            
-            logger.info(f"Created {len(charts)} visualization charts")
-            
+            # Build the flights frame once for every chart that needs per-flight data
+            df = _flights_frame(processed_data)
         except Exception as e:
             logger.error(f"Error creating charts: {str(e)}")
             charts['error'] = str(e)
+            return charts
+        
+        # Chart builders are independent, so run them side by side
+        tasks = {
+            'price_trends': (self._create_price_trend_chart, (processed_data, df)),
+            'route_popularity': (self._create_route_popularity_chart, (processed_data,)),
+            'weekly_patterns': (self._create_weekly_pattern_chart, (processed_data,)),
+            'price_distribution': (self._create_price_distribution_chart, (processed_data, df)),
+            'airline_comparison': (self._create_airline_comparison_chart, (processed_data,)),
+            'daily_volume': (self._create_daily_volume_chart, (processed_data,))
+        }
+        with ThreadPoolExecutor(max_workers=len(tasks)) as executor:
+            futures = {name: executor.submit(fn, *args) for name, (fn, args) in tasks.items()}
+        
+        # A failing chart is reported without discarding the others
+        for name, future in futures.items():
+            try:
+                charts[name] = future.result()
+            except Exception as e:
+                logger.error(f"Error creating {name} chart: {str(e)}")
+                charts['error'] = str(e)
+        
+        logger.info(f"Created {len(charts)} visualization charts")
         
         return charts
     
-    def _create_price_trend_chart(self, data: Dict) -> str:
+    def _create_price_trend_chart(self, data: Dict, df: pd.DataFrame) -> str:
         """Create price trend over time chart"""
         
-        flights_data = data.get('flights_data', [])
-        if not flights_data:
+        if df.empty or 'price' not in df.columns:
             return self._create_empty_chart("No data available for price trends")
         
-        # Convert to DataFrame
-        df = pd.DataFrame(flights_data)
-        
         # Group by date and calculate average price
         if 'date' in df.columns:
-            df['date'] = pd.to_datetime(df['date'])
             daily_prices = df.groupby(df['date'].dt.date)['price'].mean().reset_index()
             daily_prices.columns = ['date', 'avg_price']
             
             fig = go.Figure()
             fig.add_trace(go.Scatter(
-                x=daily_prices['date'],
-                y=daily_prices['avg_price'],
+                x=daily_prices['date'].to_numpy(),
+                y=daily_prices['avg_price'].to_numpy(),
                 mode='lines+markers',
                 name='Average Price',
                 line=dict(color=self.color_palette[0], width=3),
@@ -91,7 +122,7 @@ class DataVisualizer:
                 template='plotly_white'
             )
             
-            return json.dumps(fig, cls=PlotlyJSONEncoder)
+            return fig.to_json(validate=False)
         
         return self._create_empty_chart("Date information not available")
     
@@ -143,7 +174,7 @@ class DataVisualizer:
             legend=dict(x=0.7, y=1)
         )
         
-        return json.dumps(fig, cls=PlotlyJSONEncoder)
+        return fig.to_json(validate=False)
     
     def _create_weekly_pattern_chart(self, data: Dict) -> str:
         """Create weekly flight pattern chart"""
@@ -179,24 +210,28 @@ class DataVisualizer:
             showlegend=False
         )
         
-        return json.dumps(fig, cls=PlotlyJSONEncoder)
+        return fig.to_json(validate=False)
     
-    def _create_price_distribution_chart(self, data: Dict) -> str:
+    def _create_price_distribution_chart(self, data: Dict, df: pd.DataFrame) -> str:
         """Create price distribution histogram"""
         
-        flights_data = data.get('flights_data', [])
-        if not flights_data:
+        if df.empty:
             return self._create_empty_chart("No data available for price distribution")
         
-        prices = [flight['price'] for flight in flights_data if 'price' in flight]
+        prices = df['price'].dropna().to_numpy(dtype=np.float64) if 'price' in df.columns else np.empty(0)
         
-        if not prices:
+        if prices.size == 0:
             return self._create_empty_chart("No price data available")
         
+        # Bin server-side so the chart ships 20 bars instead of every price
+        counts, edges = np.histogram(prices, bins=20)
+        
+        # Plain lists keep the 20-point payload readable by plotly.js builds without typed-array support
         fig = go.Figure()
-        fig.add_trace(go.Histogram(
-            x=prices,
-            nbinsx=20,
+        fig.add_trace(go.Bar(
+            x=((edges[:-1] + edges[1:]) / 2).tolist(),
+            y=counts.tolist(),
+            width=np.diff(edges).tolist(),
             marker_color=self.color_palette[2],
             opacity=0.7,
             name='Price Distribution'
@@ -210,7 +245,7 @@ class DataVisualizer:
             showlegend=False
         )
         
-        return json.dumps(fig, cls=PlotlyJSONEncoder)
+        return fig.to_json(validate=False)
     
     def _create_airline_comparison_chart(self, data: Dict) -> str:
         """Create airline comparison chart"""
@@ -257,7 +292,7 @@ class DataVisualizer:
             template='plotly_white'
         )
         
-        return json.dumps(fig, cls=PlotlyJSONEncoder)
+        return fig.to_json(validate=False)
     
     def _create_daily_volume_chart(self, data: Dict) -> str:
         """Create daily flight volume chart"""
@@ -298,28 +333,11 @@ class DataVisualizer:
             showlegend=False
         )
         
-        return json.dumps(fig, cls=PlotlyJSONEncoder)
+        return fig.to_json(validate=False)
     
     def _create_empty_chart(self, message: str) -> str:
         """Create an empty chart with a message"""
-        
-        fig = go.Figure()
-        fig.add_annotation(
-            text=message,
-            xref="paper", yref="paper",
-            x=0.5, y=0.5,
-            showarrow=False,
-            font=dict(size=16)
-        )
-        
-        fig.update_layout(
-            title='No Data Available',
-            template='plotly_white',
-            xaxis=dict(showgrid=False, showticklabels=False),
-            yaxis=dict(showgrid=False, showticklabels=False)
-        )
-        
-        return json.dumps(fig, cls=PlotlyJSONEncoder)
+        return _empty_chart_json(message)
     
     def create_summary_metrics(self, data: Dict) -> Dict:
         """Create summary metrics for dashboard"""
@@ -5,28 +5,39 @@ Basic tests for the Airline Market Analyzer application
 import unittest
 import sys
 import os
+import functools
 from datetime import datetime, timedelta
 
-# Add the src directory to the path
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+# Add the src directory to the path (conftest.py already does this under pytest)
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src')
+if SRC not in sys.path:
+    sys.path.insert(0, SRC)
 
-from data_collector import DataCollector
-from data_processor import DataProcessor
-from api_integrator import APIIntegrator
-from visualizer import DataVisualizer
+# Components are imported inside each test class, so a pytest-xdist worker
+# only pays for the modules its classes use (plotly, Flask-side integrations, ...)
+
+# Search window shared by all tests, derived from one clock reading so it can't straddle midnight
+_NOW = datetime.now()
+_TODAY = _NOW.strftime('%Y-%m-%d')
+_NEXT_WEEK = (_NOW + timedelta(days=7)).strftime('%Y-%m-%d')
+
+@functools.lru_cache(maxsize=1)
+def _sample():
+    """DataProcessor sample data, built once per test run"""
+    from data_processor import DataProcessor
+    return DataProcessor().get_sample_data()
 
 class TestDataCollector(unittest.TestCase):
     """Test the DataCollector class"""
     
-    def setUp(self):
-        self.collector = DataCollector()
+    @classmethod
+    def setUpClass(cls):
+        from data_collector import DataCollector
+        cls.collector = DataCollector()
     
     def test_generate_sample_data(self):
         """Test sample data generation"""
-        today = datetime.now().strftime('%Y-%m-%d')
-        next_week = (datetime.now() + timedelta(days=7)).strftime('%Y-%m-%d')
-        
-        data = self.collector._generate_sample_data('SYD', 'MEL', today, next_week)
+        data = self.collector._generate_sample_data('SYD', 'MEL', _TODAY, _NEXT_WEEK)
         
         self.assertIsInstance(data, list)
         self.assertGreater(len(data), 0)
@@ -41,24 +52,102 @@ class TestDataCollector(unittest.TestCase):
     
     def test_collect_flight_data(self):
         """Test flight data collection"""
-        today = datetime.now().strftime('%Y-%m-%d')
-        next_week = (datetime.now() + timedelta(days=7)).strftime('%Y-%m-%d')
-        
-        data = self.collector.collect_flight_data('SYD', 'MEL', today, next_week)
+        data = self.collector.collect_flight_data('SYD', 'MEL', _TODAY, _NEXT_WEEK)
         
         self.assertIsInstance(data, dict)
         self.assertIn('flights', data)
         self.assertIn('search_params', data)
         self.assertIn('market_data', data)
 
+    def test_cache_data_skips_unchanged_payload(self):
+        """Re-caching the same flights with only a new collection timestamp writes no new snapshot"""
+        import tempfile
+        from data_collector import DataCollector
+        
+        collector = DataCollector()
+        with tempfile.TemporaryDirectory() as cache_dir:
+            collector.cache_dir = cache_dir
+            data = {
+                'flights': [{'price': 150, 'origin': 'SYD', 'destination': 'MEL', 'date': _TODAY}],
+                'search_params': {'origin': 'SYD', 'destination': 'MEL'},
+            }
+            collector._cache_data(dict(data, collection_timestamp='2024-01-01T00:00:00'))
+            collector._cache_data(dict(data, collection_timestamp='2024-01-01T01:00:00'))
+            
+            snapshots = [f for f in os.listdir(cache_dir) if f.startswith('flight_data_')]
+            self.assertEqual(len(snapshots), 1)
+            
+            # The written snapshot still carries the first collection timestamp
+            cached = collector.get_cached_data()
+            self.assertEqual(cached['collection_timestamp'], '2024-01-01T00:00:00')
+            self.assertEqual(cached['flights'], data['flights'])
+
+    def test_update_latest_and_prune_cache(self):
+        """latest.json.gz links to the newest snapshot and old snapshots are pruned"""
+        import tempfile
+        from data_collector import DataCollector
+        
+        collector = DataCollector()
+        with tempfile.TemporaryDirectory() as cache_dir:
+            collector.cache_dir = cache_dir
+            for i in range(5):
+                path = os.path.join(cache_dir, f'flight_data_20240101_00000{i}.json.gz')
+                with open(path, 'wb') as f:
+                    f.write(b'snapshot %d' % i)
+                collector._update_latest(path, b'snapshot %d' % i)
+            # A writer's in-flight temp file is not a snapshot and must survive pruning
+            with open(os.path.join(cache_dir, 'flight_data_20240101_000009.json.gz.tmp'), 'wb') as f:
+                f.write(b'in flight')
+            collector._prune_cache(keep=3)
+            
+            snapshots = sorted(f for f in os.listdir(cache_dir) if f.endswith('.json.gz') and f.startswith('flight_data_'))
+            self.assertEqual(snapshots, [f'flight_data_20240101_00000{i}.json.gz' for i in (2, 3, 4)])
+            self.assertTrue(os.path.exists(os.path.join(cache_dir, 'flight_data_20240101_000009.json.gz.tmp')))
+            
+            latest = os.path.join(cache_dir, 'latest.json.gz')
+            self.assertTrue(os.path.samefile(latest, os.path.join(cache_dir, snapshots[-1])))
+            self.assertFalse(os.path.exists(latest + '.tmp'))
+
+    def test_update_latest_concurrent_and_without_hardlinks(self):
+        """Concurrent latest updates leave every snapshot intact; no-hardlink filesystems get a copy"""
+        import errno
+        import tempfile
+        from concurrent.futures import ThreadPoolExecutor
+        from unittest import mock
+        from data_collector import DataCollector
+        
+        collector = DataCollector()
+        with tempfile.TemporaryDirectory() as cache_dir:
+            collector.cache_dir = cache_dir
+            paths = {}
+            for i in range(8):
+                paths[i] = os.path.join(cache_dir, f'flight_data_20240101_00000{i}.json.gz')
+                with open(paths[i], 'wb') as f:
+                    f.write(b'snapshot %d' % i)
+            with ThreadPoolExecutor(max_workers=8) as ex:
+                list(ex.map(lambda i: collector._update_latest(paths[i], b'snapshot %d' % i), paths))
+            for i, path in paths.items():
+                with open(path, 'rb') as f:
+                    self.assertEqual(f.read(), b'snapshot %d' % i)
+            
+            with mock.patch('os.link', side_effect=OSError(errno.EPERM, 'not supported')):
+                collector._update_latest(paths[0], b'copied')
+            with open(os.path.join(cache_dir, 'latest.json.gz'), 'rb') as f:
+                self.assertEqual(f.read(), b'copied')
+            with open(paths[0], 'rb') as f:
+                self.assertEqual(f.read(), b'snapshot 0')
+            self.assertEqual([f for f in os.listdir(cache_dir) if f.endswith('.tmp')], [])
+
 class TestDataProcessor(unittest.TestCase):
     """Test the DataProcessor class"""
     
-    def setUp(self):
-        self.processor = DataProcessor()
+    @classmethod
+    def setUpClass(cls):
+        from data_processor import DataProcessor
+        cls.processor = DataProcessor()
         
-        # Create sample data for testing
-        self.sample_data = {
+        # Create sample data for testing (read-only, shared by all tests in the class)
+        cls.sample_data = {
             'flights': [
                 {'price': 150, 'origin': 'SYD', 'destination': 'MEL', 'date': '2024-01-01', 'airline': 'Qantas'},
                 {'price': 180, 'origin': 'SYD', 'destination': 'MEL', 'date': '2024-01-02', 'airline': 'Virgin'},
@@ -72,12 +161,70 @@ class TestDataProcessor(unittest.TestCase):
         
         self.assertIsInstance(result, dict)
         self.assertIn('analysis', result)
-        self.assertIn('flights_data', result)
+        self.assertIn('flights_data_columns', result)
         self.assertIn('total_flights', result)
     
+    def test_demand_ignores_missing_routes(self):
+        """Rows without a route don't leak into another route's demand"""
+        import pandas as pd
+        df = pd.DataFrame({
+            'route': ['SYD-MEL', 'MEL-SYD', None],
+            'price': [150.0, 180.0, 160.0],
+            'demand_score': [0.1, 0.3, 0.99],
+        })
+        
+        demand = self.processor._analyze_demand(df)
+        
+        self.assertEqual(demand['high_demand_routes'], {'MEL-SYD': 0.3})
+    
+    def test_group_price_stats_matches_groupby(self):
+        """Both grouped-stats paths agree with pandas groupby().agg(), skipping missing direct flags"""
+        from unittest import mock
+        import numpy as np
+        import pandas as pd
+        import data_processor
+        
+        rng = np.random.default_rng(0)
+        for size in (data_processor.JIT_MIN_SIZE - 1, data_processor.JIT_MIN_SIZE):
+            df = pd.DataFrame({
+                'route': rng.choice(['SYD-MEL', 'MEL-SYD', 'SYD-BNE', None], size),
+                'price': rng.integers(80, 400, size).astype(float),
+                'direct': rng.choice(np.array([True, False, None], dtype=object), size),
+            })
+            # A group whose direct flags are all missing
+            df.loc[df['route'] == 'SYD-BNE', 'direct'] = None
+            expected = df.assign(direct=df['direct'].astype(float)).groupby('route').agg(
+                flight_count=('price', 'count'), avg_price=('price', 'mean'), min_price=('price', 'min'),
+                max_price=('price', 'max'), direct_ratio=('direct', 'mean')).round(2).reset_index()
+            
+            for numba_available in (False, data_processor.NUMBA_AVAILABLE):
+                with self.subTest(size=size, numba=numba_available), \
+                        mock.patch.object(data_processor, 'NUMBA_AVAILABLE', numba_available):
+                    stats = data_processor._group_price_stats(df, 'route')
+                    pd.testing.assert_frame_equal(stats, expected, check_dtype=False)
+    
+    def test_popular_routes_break_ties_by_route(self):
+        """The top 10 routes match a full stable sort by flight count, ties in route order"""
+        import numpy as np
+        import pandas as pd
+        
+        rng = np.random.default_rng(1)
+        routes = [f'R{i:02d}' for i in range(30)]
+        for _ in range(20):
+            counts = rng.integers(1, 5, len(routes))
+            df = pd.DataFrame({
+                'route': np.repeat(routes, counts),
+                'price': rng.integers(80, 400, counts.sum()).astype(float),
+            })
+            
+            popular = [r['route'] for r in self.processor._analyze_routes(df)['popular_routes']]
+            
+            expected = pd.Series(counts, index=routes).sort_values(ascending=False, kind='stable')
+            self.assertEqual(popular, expected.index[:10].tolist())
+    
     def test_get_sample_data(self):
         """Test sample data retrieval"""
-        data = self.processor.get_sample_data()
+        data = _sample()
         
         self.assertIsInstance(data, dict)
         self.assertIn('popular_routes', data)
@@ -86,11 +233,13 @@ class TestDataProcessor(unittest.TestCase):
 class TestAPIIntegrator(unittest.TestCase):
     """Test the APIIntegrator class"""
     
-    def setUp(self):
-        self.integrator = APIIntegrator()
+    @classmethod
+    def setUpClass(cls):
+        from api_integrator import APIIntegrator
+        cls.integrator = APIIntegrator()
         
         # Sample processed data
-        self.sample_processed_data = {
+        cls.sample_processed_data = {
             'analysis': {
                 'summary': {
                     'total_flights': 100,
@@ -112,6 +261,31 @@ class TestAPIIntegrator(unittest.TestCase):
         self.assertIn('source', insights)
         self.assertIn('generated_at', insights)
     
+    def test_route_insights_from_columns(self):
+        """Route insights read the columnar flights from process_data"""
+        data = {'flights_data_columns': {
+            'route': ['SYD-MEL', 'MEL-SYD', 'SYD-MEL'],
+            'price': [150.0, 120.0, 190.0],
+        }}
+        
+        insights = self.integrator.get_route_insights('SYD-MEL', data)
+        
+        self.assertEqual(insights['flight_count'], 2)
+        self.assertEqual(insights['price_analysis']['average'], 170)
+    
+    def test_route_insights_from_legacy_records(self):
+        """Route insights still work for payloads with per-flight records only"""
+        data = {'flights_data': [
+            {'route': 'SYD-MEL', 'price': 150},
+            {'route': 'SYD-MEL', 'price': 190},
+            {'route': 'MEL-SYD', 'price': 120},
+        ]}
+        
+        insights = self.integrator.get_route_insights('SYD-MEL', data)
+        
+        self.assertEqual(insights['flight_count'], 2)
+        self.assertEqual(insights['price_analysis']['average'], 170)
+    
     def test_rule_based_insights(self):
         """Test rule-based insights generation"""
         insights = self.integrator._generate_rule_based_insights(self.sample_processed_data)
@@ -123,11 +297,13 @@ class TestAPIIntegrator(unittest.TestCase):
 class TestDataVisualizer(unittest.TestCase):
     """Test the DataVisualizer class"""
     
-    def setUp(self):
-        self.visualizer = DataVisualizer()
+    @classmethod
+    def setUpClass(cls):
+        from visualizer import DataVisualizer
+        cls.visualizer = DataVisualizer()
         
         # Sample processed data
-        self.sample_data = {
+        cls.sample_data = {
             'flights_data': [
                 {'price': 150, 'date': '2024-01-01', 'airline': 'Qantas'},
                 {'price': 180, 'date': '2024-01-02', 'airline': 'Virgin'},
@@ -164,6 +340,11 @@ class TestIntegration(unittest.TestCase):
     
     def test_complete_workflow(self):
         """Test the complete data processing workflow"""
+        from data_collector import DataCollector
+        from data_processor import DataProcessor
+        from api_integrator import APIIntegrator
+        from visualizer import DataVisualizer
+        
         # Initialize components
         collector = DataCollector()
         processor = DataProcessor()
@@ -171,10 +352,7 @@ class TestIntegration(unittest.TestCase):
         visualizer = DataVisualizer()
         
         # Collect data
-        today = datetime.now().strftime('%Y-%m-%d')
-        next_week = (datetime.now() + timedelta(days=7)).strftime('%Y-%m-%d')
-        
-        raw_data = collector.collect_flight_data('SYD', 'MEL', today, next_week)
+        raw_data = collector.collect_flight_data('SYD', 'MEL', _TODAY, _NEXT_WEEK)
         self.assertIsInstance(raw_data, dict)
         
         # Process data
@@ -191,25 +369,26 @@ class TestIntegration(unittest.TestCase):
         
         print("✅ Complete workflow test passed!")
 
+def _xdist_available() -> bool:
+    """Check whether pytest and pytest-xdist are installed"""
+    try:
+        import pytest  # noqa: F401
+        import xdist  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
 def run_tests():
     """Run all tests"""
     print("🧪 Running Airline Market Analyzer Tests...\n")
     
-    # Create test suite
-    test_suite = unittest.TestSuite()
-    
-    # Add test classes
-    test_classes = [
-        TestDataCollector,
-        TestDataProcessor,
-        TestAPIIntegrator,
-        TestDataVisualizer,
-        TestIntegration
-    ]
-    
-    for test_class in test_classes:
-        tests = unittest.TestLoader().loadTestsFromTestCase(test_class)
-        test_suite.addTests(tests)
+    # Spread test classes across CPU cores when pytest-xdist is installed
+    if _xdist_available():
+        import pytest
+        return pytest.main(['-n', 'auto', __file__]) == 0
+    
+    # Collect every TestCase in this module in one pass
+    test_suite = unittest.TestLoader().loadTestsFromModule(sys.modules[__name__])
     
     # Run tests
     runner = unittest.TextTestRunner(verbosity=2)
@@ -1,46 +1,90 @@
 import sys, os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from urllib.parse import urlencode
 
-# Ensure project root is on sys.path
+# Ensure project root is on sys.path (conftest.py already does this under pytest)
 ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 if ROOT not in sys.path:
     sys.path.insert(0, ROOT)
 
-try:
-    from app import app
-except Exception as e:
-    print(f"IMPORT_ERR {e}")
-    sys.exit(1)
 
+# SMOKE_FAIL_FAST=1 stops at the first non-200 instead of probing every endpoint
+FAIL_FAST = os.environ.get('SMOKE_FAIL_FAST') == '1'
 
-def check(endpoint: str):
-    with app.test_client() as c:
-        rv = c.get(endpoint)
-        print(endpoint, rv.status_code)
-        if rv.status_code != 200:
-            return False
-        return True
+# results with query params
+PARAMS = {
+    'origin': 'SYD',
+    'destination': 'MEL',
+    'date_from': '2025-09-01',
+    'date_to': '2025-09-07',
+}
+
+ENDPOINTS = [
+    '/',
+    '/search',
+    '/trends',
+    '/about',
+    '/results?' + urlencode(PARAMS),
+]
+
+
+def status(client, endpoint: str) -> int:
+    return client.get(endpoint).status_code
+
+
+def pytest_generate_tests(metafunc):
+    # One pytest test per endpoint so xdist can fan them out (no pytest import needed for main())
+    if 'endpoint' in metafunc.fixturenames:
+        metafunc.parametrize('endpoint', ENDPOINTS)
+
+
+def test_endpoint(client, endpoint):
+    assert status(client, endpoint) == 200
+
+
+def test_results_stream(client):
+    rv = client.get('/results/stream?' + urlencode(PARAMS))
+    assert rv.status_code == 200
+    assert rv.mimetype == 'text/event-stream'
+    # Without OpenAI the stream falls back to the other providers and ends with one insights event
+    assert 'event: insights\n' in rv.get_data(as_text=True)
+
+
+def test_results_without_redis_renders_insights_inline(client, monkeypatch):
+    import app as app_module
+    monkeypatch.setattr(app_module, 'get_redis', lambda: None)
+    monkeypatch.setattr(app_module.get_api_integrator(), 'can_stream_insights', lambda: True)
+    rv = client.get('/results?' + urlencode(dict(PARAMS, origin='BNE')))
+    assert rv.status_code == 200
+    # The stream could not read this request's data back, so the page must not open one
+    assert 'EventSource' not in rv.get_data(as_text=True)
 
 
 def main():
-    ok = True
-    endpoints = [
-        '/',
-        '/search',
-        '/trends',
-        '/about',
-    ]
-    for ep in endpoints:
-        ok = check(ep) and ok
-
-    # results with query params
-    params = {
-        'origin': 'SYD',
-        'destination': 'MEL',
-        'date_from': '2025-09-01',
-        'date_to': '2025-09-07',
-    }
-    ok = check('/results?' + urlencode(params)) and ok
+    # The Flask app is imported here; under pytest the session `client` fixture imports it
+    try:
+        from app import app
+    except Exception as e:
+        print(f"IMPORT_ERR {e}")
+        sys.exit(1)
+
+    # One client for every probe; the probes are independent GETs, so issue them concurrently.
+    # The client is not entered as a context manager: each get() then pushes its own request context.
+    # Fail-fast mode probes one at a time (heaviest, /results, last) so a failure skips the rest.
+    c = app.test_client()
+    codes = {}
+    with ThreadPoolExecutor(max_workers=1 if FAIL_FAST else len(ENDPOINTS)) as ex:
+        futures = {ex.submit(status, c, ep): ep for ep in ENDPOINTS}
+        for future in as_completed(futures):
+            codes[futures[future]] = code = future.result()
+            if FAIL_FAST and code != 200:
+                for pending in futures:
+                    pending.cancel()
+                break
+    for ep in ENDPOINTS:
+        if ep in codes:
+            print(ep, codes[ep])
+    ok = len(codes) == len(ENDPOINTS) and all(code == 200 for code in codes.values())
 
     print('SMOKE_OK' if ok else 'SMOKE_FAIL')
     sys.exit(0 if ok else 1)